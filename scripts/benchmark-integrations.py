@@ -0,0 +1,41 @@
+"""
+Measures `Hub.current.get_integration` as called on every log record, HTTP
+request and SQL query, for an enabled integration, a disabled integration
+and without a client.
+
+    python scripts/benchmark-integrations.py [iterations]
+"""
+import sys
+import timeit
+
+from sentry_sdk import Client, Hub
+from sentry_sdk.integrations.logging import LoggingIntegration
+from sentry_sdk.integrations.stdlib import StdlibIntegration
+
+
+def lookup(integration):
+    return Hub.current.get_integration(integration)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+    cases = [
+        ("no client", None, LoggingIntegration),
+        ("enabled", Client(integrations=[LoggingIntegration()]), LoggingIntegration),
+        (
+            "disabled",
+            Client(default_integrations=False, integrations=[LoggingIntegration()]),
+            StdlibIntegration,
+        ),
+    ]
+
+    for name, client, integration in cases:
+        with Hub(client):
+            assert (lookup(integration) is not None) == (name == "enabled")
+            took = timeit.timeit(lambda: lookup(integration), number=iterations)
+        print("%-10s %6.0f ns/call" % (name + ":", took * 1e9 / iterations))
+
+
+if __name__ == "__main__":
+    main()
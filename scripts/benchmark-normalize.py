@@ -0,0 +1,74 @@
+"""
+Compares `normalize_event` with the `convert_types`, `strip_event_mut` and
+`flatten_metadata` chain it replaces on an event with local variables and a
+full breadcrumb buffer.
+
+    python scripts/benchmark-normalize.py [iterations]
+"""
+import copy
+import sys
+import timeit
+
+from datetime import datetime
+
+from sentry_sdk.utils import (
+    convert_types,
+    event_from_exception,
+    flatten_metadata,
+    normalize_event,
+    strip_event_mut,
+)
+
+
+def make_event():
+    def inner(depth):
+        data = {"user_%d" % i: {"id": i, "name": u"x" * 100} for i in range(50)}  # noqa
+        rows = [(i, u"row %d" % i, datetime.utcnow()) for i in range(100)]  # noqa
+        blob = b"\x00" * 4096  # noqa
+        if depth:
+            return inner(depth - 1)
+        1 / 0
+
+    try:
+        inner(10)
+    except Exception:
+        event, _ = event_from_exception(sys.exc_info())
+
+    event["breadcrumbs"] = [
+        {
+            "timestamp": datetime.utcnow(),
+            "category": "query",
+            "message": u"SELECT * FROM table WHERE id = %s" % i,
+            "data": {"params": list(range(30))},
+        }
+        for i in range(100)
+    ]
+    event["request"] = {"data": {"field_%d" % i: u"y" * 1000 for i in range(30)}}
+    event["extra"] = {"sys.argv": sys.argv}
+    return event
+
+
+def chain(event):
+    event = convert_types(event)
+    strip_event_mut(event)
+    return flatten_metadata(event)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    event = make_event()
+    assert normalize_event(copy.deepcopy(event)) == chain(copy.deepcopy(event))
+
+    events = [copy.deepcopy(event) for _ in range(iterations)]
+    old = timeit.timeit(lambda: chain(events.pop()), number=iterations)
+
+    events = [copy.deepcopy(event) for _ in range(iterations)]
+    new = timeit.timeit(lambda: normalize_event(events.pop()), number=iterations)
+
+    print("chain:           %.3f ms/event" % (old * 1000 / iterations))
+    print("normalize_event: %.3f ms/event" % (new * 1000 / iterations))
+    print("speedup:         %.2fx" % (old / new))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Measures `import sentry_sdk` and `sentry_sdk.init()` in fresh interpreters
+and lists the slowest imports below `sentry_sdk` as reported by
+`-X importtime` (Python 3.7+).
+
+    python scripts/benchmark-startup.py [runs]
+"""
+import subprocess
+import sys
+
+CODE = """
+import time
+start = time.time()
+import sentry_sdk
+imported = time.time()
+sentry_sdk.init("https://key@sentry.invalid/1", shutdown_timeout=0)
+print(imported - start, time.time() - imported)
+"""
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+    results = []
+    for _ in range(runs):
+        out = subprocess.check_output([sys.executable, "-c", CODE])
+        results.append([float(x) for x in out.split()])
+
+    for i, name in enumerate(("import", "init")):
+        took = sorted(r[i] for r in results)[len(results) // 2]
+        print("%-7s %6.1f ms (median)" % (name + ":", took * 1000))
+
+    stderr = subprocess.Popen(
+        [sys.executable, "-X", "importtime", "-c", CODE],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    ).communicate()[1]
+
+    timings = []
+    for line in stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            timings.append((int(parts[1]), parts[2].rstrip()))
+
+    print("\nslowest imports (cumulative us):")
+    for took, name in sorted(timings, reverse=True)[:15]:
+        print("  %8d %s" % (took, name))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+An asyncio native transport for applications that run on an event loop
+(aiohttp, Sanic, Tornado 5+).  It requires Python 3.5 or later and the
+`aiohttp` package:
+
+    import sentry_sdk
+    from sentry_sdk.async_transport import AsyncHttpTransport
+
+    sentry_sdk.init(dsn, transport=AsyncHttpTransport)
+"""
+import asyncio
+import ssl
+import time
+
+from email.utils import parsedate_tz, mktime_tz
+
+import aiohttp  # type: ignore
+import certifi
+
+from datetime import datetime, timedelta
+
+from sentry_sdk.transport import HttpTransport, _DeferredEvent, _gzip_json, _get_proxy
+from sentry_sdk.utils import logger, capture_internal_exceptions
+
+if False:
+    from sentry_sdk.consts import ClientOptions
+    from sentry_sdk.hub import Hub
+    from typing import Any
+    from typing import Callable
+    from typing import Dict
+    from typing import Optional
+    from typing import Tuple
+
+
+def _get_running_loop():
+    # type: () -> Optional[asyncio.AbstractEventLoop]
+    try:
+        return asyncio.get_running_loop()  # type: ignore
+    except AttributeError:
+        # Python < 3.7
+        return asyncio._get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _parse_retry_after(value):
+    # type: (Optional[str]) -> Optional[float]
+    """Returns the seconds to wait for a `Retry-After` header, which holds
+    either a number of seconds or an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    parsed = parsedate_tz(value)
+    if parsed is None:
+        return None
+    return max(mktime_tz(parsed) - time.time(), 0)
+
+
+class AsyncHttpTransport(HttpTransport):
+    """An HTTP transport that sends events from the event loop with aiohttp
+    instead of from a background thread.
+
+    The transport binds to the first running event loop it captures an
+    event on.  Events captured from other threads are handed over to that
+    loop.  Before a loop is bound, or after it stopped, events go through
+    the threaded `HttpTransport` machinery instead, so nothing is lost at
+    interpreter shutdown.
+    """
+
+    def __init__(self, options):
+        # type: (ClientOptions) -> None
+        if options["spool_dir"]:
+            # Failed sends would have to be written to disk from the loop
+            raise ValueError("AsyncHttpTransport does not support spool_dir")
+        HttpTransport.__init__(self, options)
+        self._loop = None  # type: Optional[asyncio.AbstractEventLoop]
+        self._queue = None  # type: Optional[asyncio.Queue]
+        self._consumer = None  # type: Optional[asyncio.Future]
+        self._session = None  # type: Optional[aiohttp.ClientSession]
+        self._async_dropped = 0
+        # Resolved up front, `getproxies()` reads the environment and on some
+        # platforms the registry, which has no place on the event loop.
+        self._proxy = _get_proxy(
+            self.parsed_dsn, options["http_proxy"], options["https_proxy"]
+        )
+
+    @property
+    def dropped_events(self):
+        # type: () -> int
+        return self._worker.dropped_events + self._async_dropped
+
+    def _get_loop(self):
+        # type: () -> Optional[asyncio.AbstractEventLoop]
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            return loop
+
+        # The bound loop is gone, so whatever it still had queued has to be
+        # sent by the background thread.
+        self._drain_to_worker()
+
+        loop = _get_running_loop()
+        if loop is not None:
+            self._loop = loop
+            self._queue = None
+            self._consumer = None
+            self._session = None
+        return loop
+
+    def _drain_to_worker(self):
+        # type: () -> None
+        """Moves events that are still queued for a loop that is no longer
+        running to the background thread."""
+        queue = self._queue
+        while queue is not None and not queue.empty():
+            hub, item = queue.get_nowait()
+            event = self._prepare_item(hub, item)
+            if event is not None:
+                with hub:
+                    HttpTransport.capture_event(self, event)
+
+    def _enqueue(self, hub, item):
+        # type: (Hub, Any) -> bool
+        if self._queue is None:
+            self._queue = asyncio.Queue(
+                maxsize=self.options["transport_queue_size"] or 0
+            )
+            self._consumer = asyncio.ensure_future(self._consume())
+        try:
+            self._queue.put_nowait((hub, item))
+        except asyncio.QueueFull:
+            self._async_dropped += 1
+            logger.debug("async transport queue full, dropped event")
+            return False
+        return True
+
+    async def _consume(self):
+        # type: () -> None
+        loop = self._loop  # type: Any
+        while True:
+            hub, item = await self._queue.get()  # type: ignore
+            try:
+                if isinstance(item, _DeferredEvent):
+                    # Serializing the event and `before_send` must not block
+                    # the loop.
+                    prepared = await loop.run_in_executor(
+                        None, self._prepare_body, hub, item
+                    )
+                else:
+                    prepared = self._prepare_body(hub, item)
+                if prepared is not None:
+                    with hub:
+                        with capture_internal_exceptions():
+                            await self._send_event_async(*prepared)
+            finally:
+                self._queue.task_done()  # type: ignore
+
+    def _prepare_body(self, hub, item):
+        # type: (Hub, Any) -> Optional[Tuple[Dict[str, Any], bytes]]
+        event = self._prepare_item(hub, item)
+        if event is None:
+            return None
+        with capture_internal_exceptions():
+            return event, _gzip_json(event)
+        return None
+
+    def _get_session(self):
+        # type: () -> aiohttp.ClientSession
+        if self._session is None:
+            context = ssl.create_default_context(
+                cafile=self.options["ca_certs"] or certifi.where()
+            )
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(ssl=context)
+            )
+        return self._session
+
+    async def _send_event_async(self, event, body):
+        # type: (Dict[str, Any], bytes) -> None
+        if self._check_disabled():
+            return
+
+        logger.debug(
+            "Sending %s event [%s] to %s project:%s"
+            % (
+                event.get("level") or "error",
+                event["event_id"],
+                self.parsed_dsn.host,
+                self.parsed_dsn.project_id,
+            )
+        )
+
+        async with self._get_session().post(
+            str(self._auth.store_api_url),
+            data=body,
+            proxy=self._proxy or None,
+            headers={
+                "X-Sentry-Auth": str(self._auth.to_header()),
+                "Content-Type": "application/json",
+                "Content-Encoding": "gzip",
+            },
+        ) as response:
+            if response.status == 429:
+                retry_after = None
+                with capture_internal_exceptions():
+                    retry_after = _parse_retry_after(
+                        response.headers.get("Retry-After")
+                    )
+                self._disabled_until = datetime.utcnow() + timedelta(
+                    seconds=retry_after or 60
+                )
+                return
+
+            elif response.status >= 300 or response.status < 200:
+                logger.error(
+                    "Unexpected status code: %s (body: %s)",
+                    response.status,
+                    await response.read(),
+                )
+
+        self._disabled_until = None
+
+    def capture_event(self, event):
+        # type: (Dict[str, Any]) -> Optional[bool]
+        loop = self._get_loop()
+        if loop is None:
+            return HttpTransport.capture_event(self, event)
+        return self._enqueue_on(loop, event)
+
+    def capture_deferred_event(self, event, prepare):
+        # type: (Dict[str, Any], Callable[[], Optional[Dict[str, Any]]]) -> None
+        loop = self._get_loop()
+        if loop is None:
+            return HttpTransport.capture_deferred_event(self, event, prepare)
+        # The consumer prepares the event in the loop's executor
+        self._enqueue_on(loop, _DeferredEvent(prepare))
+
+    def _enqueue_on(self, loop, item):
+        # type: (asyncio.AbstractEventLoop, Any) -> Optional[bool]
+        """Queues the item on the loop.  Returns whether it was queued, or
+        `None` if that is only known once the loop got to it."""
+        hub = self.hub_cls.current
+        if _get_running_loop() is loop:
+            return self._enqueue(hub, item)
+        loop.call_soon_threadsafe(self._enqueue, hub, item)
+        return None
+
+    async def flush_async(self, timeout):
+        # type: (float) -> None
+        """Waits up to `timeout` seconds for the events queued on the event
+        loop to be sent.  Must be awaited on the loop the transport is bound
+        to."""
+        logger.debug("Flushing async HTTP transport")
+        if self._queue is None or timeout <= 0:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.debug("%d event(s) pending on flush", self._queue.qsize())
+
+    def flush(self, timeout, callback=None):
+        # type: (float, Optional[Any]) -> None
+        loop = self._loop
+        if loop is not None and self._queue is not None:
+            if not loop.is_running():
+                self._drain_to_worker()
+            elif _get_running_loop() is loop:
+                # Blocking here would deadlock the loop.
+                logger.debug(
+                    "Cannot flush from the event loop thread, "
+                    "use `await transport.flush_async(timeout)`."
+                )
+            else:
+                future = asyncio.run_coroutine_threadsafe(
+                    self.flush_async(timeout), loop
+                )
+                with capture_internal_exceptions():
+                    future.result(timeout)
+        HttpTransport.flush(self, timeout, callback)
+
+    def kill(self):
+        # type: () -> None
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            if self._consumer is not None:
+                loop.call_soon_threadsafe(self._consumer.cancel)
+            if self._session is not None:
+                session = self._session
+                loop.call_soon_threadsafe(
+                    lambda: asyncio.ensure_future(session.close())
+                )
+        self._consumer = None
+        self._session = None
+        HttpTransport.kill(self)
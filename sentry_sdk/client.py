@@ -2,16 +2,20 @@ import os
 import uuid
 import random
 from datetime import datetime
+from time import time
 
 from sentry_sdk._compat import string_types, text_type
 from sentry_sdk.utils import (
-    strip_event_mut,
-    flatten_metadata,
-    convert_types,
+    normalize_event,
     handle_in_app,
     get_type_name,
     capture_internal_exceptions,
+    event_from_exception,
+    event_hint_with_exc_info,
     current_stacktrace,
+    budget_from_options,
+    frame_window_from_options,
+    resolve_pending_frames,
     logger,
 )
 from sentry_sdk.transport import make_transport
@@ -21,15 +25,43 @@ from sentry_sdk.utils import ContextVar
 
 if False:
     from sentry_sdk.consts import ClientOptions
+    from sentry_sdk.integrations import Integration
     from sentry_sdk.scope import Scope
     from typing import Any
     from typing import Dict
+    from typing import List
     from typing import Optional
+    from typing import Type
+    from typing import Union
+
+    from sentry_sdk.utils import ExcInfo
+    from sentry_sdk.utils import PendingFrame
 
 
 _client_init_debug = ContextVar("client_init_debug")
 
 
+def _copy_scope_data(event):
+    # type: (Dict[str, Any]) -> None
+    """Copies the containers the scope shares with the event, which the
+    application may still modify until a deferred event is prepared."""
+    for key in ("user", "tags", "extra"):
+        value = event.get(key)
+        if isinstance(value, dict):
+            event[key] = dict(value)
+
+    fingerprint = event.get("fingerprint")
+    if isinstance(fingerprint, list):
+        event["fingerprint"] = list(fingerprint)
+
+    contexts = event.get("contexts")
+    if isinstance(contexts, dict):
+        event["contexts"] = dict(
+            (key, dict(value) if isinstance(value, dict) else value)
+            for key, value in contexts.items()
+        )
+
+
 def get_options(*args, **kwargs):
     # type: (*str, **ClientOptions) -> ClientOptions
     if args and (isinstance(args[0], string_types) or args[0] is None):
@@ -86,9 +118,34 @@ class Client(object):
             self.integrations = setup_integrations(
                 options["integrations"], with_defaults=options["default_integrations"]
             )
+            # Integrations (or `None`) by the names and classes they were
+            # looked up with
+            self._integration_lookup = {}  # type: Dict[Any, Optional[Integration]]
+            # Set by `sentry_sdk.init` for the client it created
+            self._is_initial_client = False
         finally:
             _client_init_debug.set(old_debug)
 
+    def get_integration(self, name_or_class):
+        # type: (Union[str, Type[Integration]]) -> Optional[Integration]
+        """Returns the integration of this client by name or class, or
+        `None` if it is not enabled."""
+        try:
+            return self._integration_lookup[name_or_class]
+        except KeyError:
+            pass
+
+        if isinstance(name_or_class, str):
+            integration_name = name_or_class
+        elif name_or_class.identifier is not None:
+            integration_name = name_or_class.identifier
+        else:
+            raise ValueError("Integration has no name")
+
+        rv = self.integrations.get(integration_name)
+        self._integration_lookup[name_or_class] = rv
+        return rv
+
     @property
     def dsn(self):
         """Returns the configured DSN as string."""
@@ -101,13 +158,27 @@ class Client(object):
         scope,  # type: Optional[Scope]
     ):
         # type: (...) -> Optional[Dict[str, Any]]
+        event = self._apply_scope(event, hint, scope)  # type: ignore
+        if event is None:
+            return None
+        return self._finish_event(event, hint)
+
+    def _apply_scope(
+        self,
+        event,  # type: Dict[str, Any]
+        hint,  # type: Optional[Dict[str, Any]]
+        scope,  # type: Optional[Scope]
+        pending=None,  # type: Optional[List[PendingFrame]]
+    ):
+        # type: (...) -> Optional[Dict[str, Any]]
+        """The part of preparing an event that needs the calling thread."""
         if event.get("timestamp") is None:
             event["timestamp"] = datetime.utcnow()
 
         if scope is not None:
             event = scope.apply_to_event(event, hint)
             if event is None:
-                return
+                return None
 
         if (
             self.options["attach_stacktrace"]
@@ -120,7 +191,10 @@ class Client(object):
                     "values": [
                         {
                             "stacktrace": current_stacktrace(
-                                self.options["with_locals"]
+                                self.options["with_locals"],
+                                budget_from_options(self.options),
+                                frame_window_from_options(self.options),
+                                pending,
                             ),
                             "crashed": False,
                             "current": True,
@@ -128,6 +202,20 @@ class Client(object):
                     ]
                 }
 
+        return event
+
+    def _finish_event(
+        self,
+        event,  # type: Dict[str, Any]
+        hint,  # type: Optional[Dict[str, Any]]
+        pending=None,  # type: Optional[List[PendingFrame]]
+    ):
+        # type: (...) -> Optional[Dict[str, Any]]
+        """The part of preparing an event that can run on any thread."""
+        if pending:
+            with capture_internal_exceptions():
+                resolve_pending_frames(pending, self.options)
+
         for key in "release", "environment", "server_name", "dist":
             if event.get(key) is None and self.options[key] is not None:  # type: ignore
                 event[key] = text_type(self.options[key]).strip()  # type: ignore
@@ -146,9 +234,7 @@ class Client(object):
         # Postprocess the event here so that annotated types do
         # generally not surface in before_send
         if event is not None:
-            event = convert_types(event)
-            strip_event_mut(event)
-            event = flatten_metadata(event)
+            event = normalize_event(event)
 
         before_send = self.options["before_send"]
         if before_send is not None:
@@ -215,21 +301,87 @@ class Client(object):
         If the transport is not set nothing happens, otherwise the return
         value of this function will be the ID of the captured event.
         """
-        if self.transport is None:
+        if self.transport is None or self.transport.is_rate_limited():
             return None
         if hint is None:
             hint = {}
+        if not self._should_capture(event, hint, scope):
+            return None
+        return self._capture_event(event, hint, scope)
+
+    def _capture_event(
+        self,
+        event,  # type: Dict[str, Any]
+        hint,  # type: Dict[str, Any]
+        scope,  # type: Optional[Scope]
+        pending=None,  # type: Optional[List[PendingFrame]]
+    ):
+        # type: (...) -> Optional[str]
         rv = event.get("event_id")
         if rv is None:
             event["event_id"] = rv = uuid.uuid4().hex
-        if not self._should_capture(event, hint, scope):
-            return None
-        event = self._prepare_event(event, hint, scope)  # type: ignore
+
+        if pending is None and self.options["defer_serialization"]:
+            pending = []
+        if pending is None:
+            event = self._prepare_event(event, hint, scope)  # type: ignore
+            if event is None:
+                return None
+            if self.transport.capture_event(event) is not False:
+                self._event_accepted(event)
+            return rv
+
+        event = self._apply_scope(event, hint, scope, pending)  # type: ignore
         if event is None:
             return None
-        self.transport.capture_event(event)
+        _copy_scope_data(event)
+
+        def prepare():
+            # type: () -> Optional[Dict[str, Any]]
+            rv = self._finish_event(event, hint, pending)
+            if rv is not None:
+                self._event_accepted(rv)
+            return rv
+
+        self.transport.capture_deferred_event(event, prepare)
         return rv
 
+    def _event_accepted(self, event):
+        # type: (Dict[str, Any]) -> None
+        for integration in self.integrations.values():
+            with capture_internal_exceptions():
+                integration.event_accepted(event)
+
+    def capture_exception(
+        self,
+        exc_info,  # type: Union[BaseException, ExcInfo]
+        mechanism=None,  # type: Optional[Dict[str, Any]]
+        scope=None,  # type: Scope
+        event=None,  # type: Optional[Dict[str, Any]]
+    ):
+        # type: (...) -> Optional[str]
+        """Captures an exception from an `exc_info` tuple or exception
+        object.
+
+        Unlike building the event with `event_from_exception` and passing it
+        to `capture_event` this checks the scope, `sample_rate` and
+        `ignore_errors` against the exception first, so the stacktrace is
+        only serialized for events that are actually sent.  Attributes in
+        the optional `event` take precedence over the generated ones.
+        """
+        if self.transport is None or self.transport.is_rate_limited():
+            return None
+        hint = event_hint_with_exc_info(exc_info)
+        if not self._should_capture({}, hint, scope):
+            return None
+        pending = [] if self.options["defer_serialization"] else None
+        rv, hint = event_from_exception(
+            exc_info, client_options=self.options, mechanism=mechanism, pending=pending
+        )
+        if event is not None:
+            rv.update(event)
+        return self._capture_event(rv, hint, scope, pending)
+
     def close(self, timeout=None, callback=None):
         """
         Close the client and shut down the transport. Arguments have the same
@@ -252,6 +404,10 @@ class Client(object):
         if self.transport is not None:
             if timeout is None:
                 timeout = self.options["shutdown_timeout"]
+            deadline = time() + timeout
+            for integration in self.integrations.values():
+                integration.flush(timeout)
+                timeout = max(deadline - time(), 0)
             self.transport.flush(timeout=timeout, callback=callback)
 
     def __enter__(self):
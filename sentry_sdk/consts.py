@@ -38,6 +38,22 @@ if False:
             "attach_stacktrace": bool,
             "ca_certs": Optional[str],
             "propagate_traces": bool,
+            "transport_queue_size": Optional[int],
+            "transport_queue_bytes": Optional[int],
+            "transport_queue_overflow": str,
+            "transport_batch_size": int,
+            "transport_batch_timeout": float,
+            "transport_num_threads": int,
+            "spool_dir": Optional[str],
+            "spool_max_bytes": int,
+            "spool_max_age": float,
+            "spool_mmap": bool,
+            "max_locals_objects": Optional[int],
+            "max_locals_bytes": Optional[int],
+            "max_locals_time": Optional[float],
+            "stacktrace_head_frames": Optional[int],
+            "stacktrace_tail_frames": Optional[int],
+            "defer_serialization": bool,
         },
         total=False,
     )
@@ -71,6 +87,22 @@ DEFAULT_OPTIONS = {
     "attach_stacktrace": False,
     "ca_certs": None,
     "propagate_traces": True,
+    "transport_queue_size": 100,
+    "transport_queue_bytes": None,
+    "transport_queue_overflow": "drop_newest",
+    "transport_batch_size": 1,
+    "transport_batch_timeout": 0.1,
+    "transport_num_threads": 1,
+    "spool_dir": None,
+    "spool_max_bytes": 50 * 1024 * 1024,
+    "spool_max_age": 24 * 60 * 60,
+    "spool_mmap": False,
+    "max_locals_objects": 10000,
+    "max_locals_bytes": 1024 * 1024,
+    "max_locals_time": 0.1,
+    "stacktrace_head_frames": 100,
+    "stacktrace_tail_frames": 100,
+    "defer_serialization": False,
 }
 
 
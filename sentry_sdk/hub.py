@@ -6,14 +6,9 @@ from contextlib import contextmanager
 from warnings import warn
 
 from sentry_sdk._compat import with_metaclass
-from sentry_sdk.scope import Scope
+from sentry_sdk.scope import Scope, Breadcrumb
 from sentry_sdk.client import Client
-from sentry_sdk.utils import (
-    exc_info_from_error,
-    event_from_exception,
-    logger,
-    ContextVar,
-)
+from sentry_sdk.utils import exc_info_from_error, logger, ContextVar
 
 
 if False:
@@ -68,6 +63,10 @@ def init(*args, **kwargs):
     Hub.current.bind_client(client)
     rv = _InitGuard(client)
     if client is not None:
+        old_client = _initial_client() if _initial_client is not None else None
+        if old_client is not None:
+            old_client._is_initial_client = False
+        client._is_initial_client = True
         _initial_client = weakref.ref(client)
     return rv
 
@@ -202,17 +201,11 @@ class Hub(with_metaclass(HubMeta)):  # type: ignore
         If the return value is not `None` the hub is guaranteed to have a
         client attached.
         """
-        if isinstance(name_or_class, str):
-            integration_name = name_or_class
-        elif name_or_class.identifier is not None:
-            integration_name = name_or_class.identifier
-        else:
-            raise ValueError("Integration has no name")
-
         client = self._stack[-1][0]
         if client is not None:
-            rv = client.integrations.get(integration_name)
-            if rv is not None:
+            # Misses are cached by the client as well
+            rv = client.get_integration(name_or_class)
+            if rv is not None or client._is_initial_client:
                 return rv
 
         initial_client = _initial_client
@@ -222,7 +215,7 @@ class Hub(with_metaclass(HubMeta)):  # type: ignore
         if (
             initial_client is not None
             and initial_client is not client
-            and initial_client.integrations.get(name_or_class) is not None
+            and initial_client.get_integration(name_or_class) is not None
         ):
             warning = (
                 "Integration %r attempted to run but it was only "
@@ -278,15 +271,22 @@ class Hub(with_metaclass(HubMeta)):  # type: ignore
             level = "info"
         return self.capture_event({"message": message, "level": level})
 
-    def capture_exception(self, error=None):
-        # type: (Optional[BaseException]) -> Optional[str]
+    def capture_exception(
+        self,
+        error=None,  # type: Optional[BaseException]
+        mechanism=None,  # type: Optional[Dict[str, Any]]
+        event=None,  # type: Optional[Dict[str, Any]]
+    ):
+        # type: (...) -> Optional[str]
         """Captures an exception.
 
         The argument passed can be `None` in which case the last exception
         will be reported, otherwise an exception object or an `exc_info`
-        tuple.
+        tuple.  Integrations pass a `mechanism` describing how the exception
+        was caught and optionally a partial `event` with attributes to set
+        on the event.
         """
-        client = self.client
+        client, scope = self._stack[-1]
         if client is None:
             return None
         if error is None:
@@ -294,13 +294,17 @@ class Hub(with_metaclass(HubMeta)):  # type: ignore
         else:
             exc_info = exc_info_from_error(error)
 
-        event, hint = event_from_exception(exc_info, client_options=client.options)
         try:
-            return self.capture_event(event, hint=hint)
+            rv = client.capture_exception(
+                exc_info, mechanism=mechanism, scope=scope, event=event
+            )
         except Exception:
             self._capture_internal_exception(sys.exc_info())
+            return None
 
-        return None
+        if rv is not None:
+            self._last_event_id = rv
+        return rv
 
     def _capture_internal_exception(self, exc_info):
         """Capture an exception that is likely caused by a bug in the SDK
@@ -308,41 +312,59 @@ class Hub(with_metaclass(HubMeta)):  # type: ignore
         logger.error("Internal error in sentry_sdk", exc_info=exc_info)
 
     def add_breadcrumb(self, crumb=None, hint=None, **kwargs):
-        # type: (Dict[str, Any], Dict[str, Any], **Any) -> None
+        # type: (Union[Dict[str, Any], Breadcrumb], Dict[str, Any], **Any) -> None
         """Adds a breadcrumb.  The breadcrumbs are a dictionary with the
         data as the sentry v7/v8 protocol expects.  `hint` is an optional
         value that can be used by `before_breadcrumb` to customize the
         breadcrumbs that are emitted.
+
+        Integrations may pass a `Breadcrumb` instead of the dictionary to
+        defer formatting it until it is sent.
         """
         client, scope = self._stack[-1]
         if client is None:
             logger.info("Dropped breadcrumb because no client bound")
             return
 
-        crumb = dict(crumb or ())  # type: Dict[str, Any]
-        crumb.update(kwargs)
-        if not crumb:
-            return
-
-        hint = dict(hint or ())
+        before_breadcrumb = client.options["before_breadcrumb"]
+        if isinstance(crumb, Breadcrumb) and before_breadcrumb is not None:
+            # `before_breadcrumb` gets to see the final breadcrumb
+            crumb = crumb.to_dict()
+            if crumb is None:
+                return
+
+        if isinstance(crumb, Breadcrumb):
+            new_crumb = crumb  # type: Any
+        elif before_breadcrumb is None:
+            # Defer building the breadcrumb until it is sent with an event
+            if crumb:
+                values = dict(crumb)
+                values.update(kwargs)
+            else:
+                values = kwargs
+            if not values:
+                return
+            new_crumb = Breadcrumb.from_dict(values)
+        else:
+            new_crumb = dict(crumb or ())
+            new_crumb.update(kwargs)
+            if not new_crumb:
+                return
 
-        if crumb.get("timestamp") is None:
-            crumb["timestamp"] = datetime.utcnow()
-        if crumb.get("type") is None:
-            crumb["type"] = "default"
+            hint = dict(hint or ())
 
-        original_crumb = crumb
-        if client.options["before_breadcrumb"] is not None:
-            crumb = client.options["before_breadcrumb"](crumb, hint)
+            if new_crumb.get("timestamp") is None:
+                new_crumb["timestamp"] = datetime.utcnow()
+            if new_crumb.get("type") is None:
+                new_crumb["type"] = "default"
 
-        if crumb is not None:
-            scope._breadcrumbs.append(crumb)
-        else:
-            logger.info("before breadcrumb dropped breadcrumb (%s)", original_crumb)
+            original_crumb = new_crumb
+            new_crumb = before_breadcrumb(new_crumb, hint)
+            if new_crumb is None:
+                logger.info("before breadcrumb dropped breadcrumb (%s)", original_crumb)
+                return
 
-        max_breadcrumbs = client.options["max_breadcrumbs"]  # type: int
-        while len(scope._breadcrumbs) > max_breadcrumbs:
-            scope._breadcrumbs.popleft()
+        scope._add_breadcrumb(new_crumb, client.options["max_breadcrumbs"])
 
     @overload  # noqa
     def push_scope(self):
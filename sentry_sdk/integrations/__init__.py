@@ -1,10 +1,12 @@
 """This package"""
 from __future__ import absolute_import
 
+import sys
+
 from threading import Lock
 
-from sentry_sdk._compat import iteritems
-from sentry_sdk.utils import logger
+from sentry_sdk._compat import iteritems, PY2
+from sentry_sdk.utils import logger, capture_internal_exceptions
 
 if False:
     from typing import Iterator
@@ -13,11 +15,88 @@ if False:
     from typing import Set
     from typing import Type
     from typing import Callable
+    from typing import Any
 
 
 _installer_lock = Lock()
 _installed_integrations = set()  # type: Set[str]
 
+_import_hook_lock = Lock()
+_import_hooks = {}  # type: Dict[str, List[Callable[[Any], None]]]
+
+
+def when_imported(module_name, callback):
+    # type: (str, Callable[[Any], None]) -> None
+    """Calls `callback` with the module `module_name` once it is imported,
+    or right away if it already is.  This lets integrations patch a library
+    without importing it themselves.  On Python 2 the module is imported
+    immediately.
+    """
+    with _import_hook_lock:
+        module = sys.modules.get(module_name)
+        if module is None:
+            if PY2:
+                from importlib import import_module
+
+                module = import_module(module_name)
+            else:
+                _import_hooks.setdefault(module_name, []).append(callback)
+                if not any(isinstance(f, _ImportHookFinder) for f in sys.meta_path):
+                    sys.meta_path.insert(0, _ImportHookFinder())
+                return
+    callback(module)
+
+
+def _run_import_hooks(module):
+    # type: (Any) -> None
+    with _import_hook_lock:
+        callbacks = _import_hooks.pop(module.__name__, ())
+    for callback in callbacks:
+        with capture_internal_exceptions():
+            callback(module)
+
+
+class _ImportHookLoader(object):
+    """Wraps the loader of a watched module to run the import hooks after
+    the module was executed."""
+
+    def __init__(self, loader):
+        # type: (Any) -> None
+        self._loader = loader
+
+    def __getattr__(self, name):
+        # type: (str) -> Any
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        # type: (Any) -> Any
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        # type: (Any) -> None
+        self._loader.exec_module(module)
+        _run_import_hooks(sys.modules.get(module.__name__, module))
+
+
+class _ImportHookFinder(object):
+    """Meta path finder that defers to the other finders and hooks the
+    loaders of modules registered with `when_imported`."""
+
+    def find_spec(self, fullname, path=None, target=None):
+        # type: (str, Any, Any) -> Any
+        if fullname not in _import_hooks:
+            return None
+
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if getattr(spec.loader, "exec_module", None) is not None:
+                    spec.loader = _ImportHookLoader(spec.loader)
+                return spec
+        return None
+
 
 def _generate_default_integrations_iterator(*import_strings):
     # type: (*str) -> Callable[[], Iterator[Type[Integration]]]
@@ -124,3 +203,17 @@ class Integration(object):
         instance again.
         """
         raise NotImplementedError()
+
+    def flush(self, timeout):
+        # type: (float) -> None
+        """Waits up to `timeout` seconds for work the integration still has
+        to hand to the client.  Called by `Client.flush`.
+        """
+        pass
+
+    def event_accepted(self, event):
+        # type: (Dict[str, Any]) -> None
+        """Called with every event of the client that passed `before_send`
+        and was accepted by the transport.
+        """
+        pass
@@ -6,11 +6,7 @@ from sentry_sdk.hub import Hub
 from sentry_sdk.integrations import Integration
 from sentry_sdk.integrations.logging import ignore_logger
 from sentry_sdk.integrations._wsgi_common import _filter_headers
-from sentry_sdk.utils import (
-    capture_internal_exceptions,
-    event_from_exception,
-    HAS_REAL_CONTEXTVARS,
-)
+from sentry_sdk.utils import capture_internal_exceptions, HAS_REAL_CONTEXTVARS
 
 import asyncio
 from aiohttp.web import Application, HTTPException  # type: ignore
@@ -111,10 +107,5 @@ def _make_request_processor(weak_request):
 def _capture_exception(hub):
     # type: (Hub) -> ExcInfo
     exc_info = sys.exc_info()
-    event, hint = event_from_exception(
-        exc_info,
-        client_options=hub.client.options,  # type: ignore
-        mechanism={"type": "aiohttp", "handled": False},
-    )
-    hub.capture_event(event, hint=hint)
+    hub.capture_exception(exc_info, mechanism={"type": "aiohttp", "handled": False})
     return exc_info
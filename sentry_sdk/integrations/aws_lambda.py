@@ -2,12 +2,7 @@ import sys
 
 from sentry_sdk.hub import Hub, _should_send_default_pii
 from sentry_sdk._compat import reraise
-from sentry_sdk.utils import (
-    AnnotatedValue,
-    capture_internal_exceptions,
-    event_from_exception,
-    logger,
-)
+from sentry_sdk.utils import AnnotatedValue, capture_internal_exceptions, logger
 from sentry_sdk.integrations import Integration
 from sentry_sdk.integrations._wsgi_common import _filter_headers
 
@@ -29,12 +24,9 @@ def _wrap_handler(handler):
                 return handler(event, context, *args, **kwargs)
             except Exception:
                 exc_info = sys.exc_info()
-                event, hint = event_from_exception(
-                    exc_info,
-                    client_options=hub.client.options,
-                    mechanism={"type": "aws_lambda", "handled": False},
+                hub.capture_exception(
+                    exc_info, mechanism={"type": "aws_lambda", "handled": False}
                 )
-                hub.capture_event(event, hint=hint)
                 reraise(*exc_info)
 
     return sentry_handler
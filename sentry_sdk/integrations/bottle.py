@@ -1,11 +1,7 @@
 from __future__ import absolute_import
 
 from sentry_sdk.hub import Hub
-from sentry_sdk.utils import (
-    capture_internal_exceptions,
-    event_from_exception,
-    transaction_from_function,
-)
+from sentry_sdk.utils import capture_internal_exceptions, transaction_from_function
 from sentry_sdk.integrations import Integration
 from sentry_sdk.integrations.wsgi import SentryWsgiMiddleware
 from sentry_sdk.integrations._wsgi_common import RequestExtractor
@@ -100,12 +96,9 @@ class BottleIntegration(Integration):
 
             def wrapped_callback(*args, **kwargs):
                 def capture_exception(exception):
-                    event, hint = event_from_exception(
-                        exception,
-                        client_options=hub.client.options,
-                        mechanism={"type": "bottle", "handled": False},
+                    hub.capture_exception(
+                        exception, mechanism={"type": "bottle", "handled": False}
                     )
-                    hub.capture_event(event, hint=hint)
 
                 try:
                     res = prepared_callback(*args, **kwargs)
@@ -10,7 +10,7 @@ from celery.exceptions import (  # type: ignore
 )
 
 from sentry_sdk.hub import Hub
-from sentry_sdk.utils import capture_internal_exceptions, event_from_exception
+from sentry_sdk.utils import capture_internal_exceptions
 from sentry_sdk.tracing import SpanContext
 from sentry_sdk._compat import reraise
 from sentry_sdk.integrations import Integration
@@ -150,13 +150,7 @@ def _capture_exception(task, exc_info):
     if hasattr(task, "throws") and isinstance(exc_info[1], task.throws):
         return
 
-    event, hint = event_from_exception(
-        exc_info,
-        client_options=hub.client.options,
-        mechanism={"type": "celery", "handled": False},
-    )
-
-    hub.capture_event(event, hint=hint)
+    hub.capture_exception(exc_info, mechanism={"type": "celery", "handled": False})
 
 
 def _patch_worker_exit():
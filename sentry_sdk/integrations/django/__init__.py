@@ -4,6 +4,12 @@ from __future__ import absolute_import
 import sys
 import weakref
 
+from datetime import date, time as dt_time, timedelta
+from decimal import Decimal
+from functools import partial
+from time import time
+from uuid import UUID
+
 from django import VERSION as DJANGO_VERSION  # type: ignore
 from django.db.models.query import QuerySet  # type: ignore
 from django.core import signals  # type: ignore
@@ -11,6 +17,7 @@ from django.core import signals  # type: ignore
 if False:
     from typing import Any
     from typing import Dict
+    from typing import Optional
     from typing import Tuple
     from typing import Union
     from sentry_sdk.integrations.wsgi import _ScopedResponse
@@ -28,12 +35,12 @@ except ImportError:
     from django.core.urlresolvers import resolve  # type: ignore
 
 from sentry_sdk import Hub
+from sentry_sdk._compat import iteritems, number_types, string_types
 from sentry_sdk.hub import _should_send_default_pii
-from sentry_sdk.scope import add_global_event_processor
+from sentry_sdk.scope import Breadcrumb, add_global_event_processor
 from sentry_sdk.utils import (
     add_global_repr_processor,
     capture_internal_exceptions,
-    event_from_exception,
     safe_repr,
     format_and_strip,
     transaction_from_function,
@@ -162,9 +169,8 @@ class DjangoIntegration(Integration):
 
             return event
 
-        @add_global_repr_processor
         def _django_queryset_repr(value, hint):
-            if not isinstance(value, QuerySet) or value._result_cache:
+            if value._result_cache:
                 return NotImplemented
 
             # Do not call Hub.get_integration here. It is intentional that
@@ -178,6 +184,8 @@ class DjangoIntegration(Integration):
                 id(value),
             )
 
+        add_global_repr_processor(_django_queryset_repr, types=(QuerySet,))
+
 
 def _make_event_processor(weak_request, integration):
     # type: (Callable[[], WSGIRequest], DjangoIntegration) -> Callable
@@ -217,12 +225,9 @@ def _got_request_exception(request=None, **kwargs):
     hub = Hub.current
     integration = hub.get_integration(DjangoIntegration)
     if integration is not None:
-        event, hint = event_from_exception(
-            sys.exc_info(),
-            client_options=hub.client.options,
-            mechanism={"type": "django", "handled": False},
+        hub.capture_exception(
+            sys.exc_info(), mechanism={"type": "django", "handled": False}
         )
-        hub.capture_event(event, hint=hint)
 
 
 class DjangoRequestExtractor(RequestExtractor):
@@ -316,44 +321,196 @@ def format_sql(sql, params):
     return sql, rv
 
 
-def record_sql(sql, params, cursor=None):
-    # type: (Any, Any, Any) -> None
-    hub = Hub.current
-    if hub.get_integration(DjangoIntegration) is None:
-        return
-
+def _format_sql_breadcrumb(sql, params):
+    # type: (Any, Any) -> Optional[Dict[str, Any]]
     real_sql = None
     real_params = None
 
     try:
-        # Prefer our own SQL formatting logic because it's the only one that
-        # has proper value trimming.
         real_sql, real_params = format_sql(sql, params)
         if real_sql:
             real_sql = format_and_strip(real_sql, real_params)
     except Exception:
         pass
 
-    if not real_sql and cursor and hasattr(cursor, "mogrify"):
-        # If formatting failed and we're using psycopg2, it could be that we're
-        # looking at a query that uses Composed objects. Use psycopg2's mogrify
-        # function to format the query. We lose per-parameter trimming but gain
-        # accuracy in formatting.
-        #
-        # This is intentionally the second choice because we assume Composed
-        # queries are not widely used, while per-parameter trimming is
-        # generally highly desirable.
-        try:
-            if cursor and hasattr(cursor, "mogrify"):
-                real_sql = cursor.mogrify(sql, params)
-                if isinstance(real_sql, bytes):
-                    real_sql = real_sql.decode(cursor.connection.encoding)
-        except Exception:
-            pass
-
     if real_sql:
+        return {"message": real_sql}
+    return None
+
+
+def _mogrify_sql(sql, params, cursor):
+    # type: (Any, Any, Any) -> Any
+    """Turns psycopg2 `Composed` queries into strings with psycopg2's
+    `mogrify` while the cursor is still usable.  We lose per-parameter
+    trimming but gain accuracy in formatting.  Returns `sql` unchanged if
+    it is a string already or cannot be formatted this way."""
+    if isinstance(sql, string_types + (bytes,)) or not hasattr(cursor, "mogrify"):
+        return sql
+    try:
+        real_sql = cursor.mogrify(sql, params)
+        if isinstance(real_sql, bytes):
+            real_sql = real_sql.decode(cursor.connection.encoding)
+        return real_sql
+    except Exception:
+        return sql
+
+
+# Parameters are cut to this length when they are kept for a breadcrumb,
+# the breadcrumb shows at most 512 characters of each anyway.
+MAX_PARAM_LENGTH = 1024
+
+_PLAIN_PARAM_TYPES = number_types + (
+    type(None),
+    Decimal,
+    date,
+    dt_time,
+    timedelta,
+    UUID,
+)
+
+
+class _ParamRepr(object):
+    """The repr of a query parameter, taken when the query ran."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        # type: (str) -> None
+        self.value = value
+
+    def __repr__(self):
+        # type: () -> str
+        return self.value
+
+
+def _copy_param(param):
+    # type: (Any) -> Any
+    if isinstance(param, _PLAIN_PARAM_TYPES):
+        return param
+    if isinstance(param, string_types + (bytes,)):
+        return param[:MAX_PARAM_LENGTH]
+    return _ParamRepr(safe_repr(param)[:MAX_PARAM_LENGTH])
+
+
+def _copy_params(params):
+    # type: (Any) -> Any
+    # The query is only formatted if the breadcrumb is sent.  Keep the
+    # parameters as they are now without holding on to model instances or
+    # large values.
+    if isinstance(params, dict):
+        return dict((k, _copy_param(v)) for k, v in iteritems(params))
+    if isinstance(params, (list, tuple)):
+        return tuple(_copy_param(param) for param in params)
+    return None
+
+
+def record_sql(sql, params, cursor=None):
+    # type: (Any, Any, Any) -> None
+    hub = Hub.current
+    if hub.get_integration(DjangoIntegration) is None:
+        return
+
+    with capture_internal_exceptions():
+        real_sql = _mogrify_sql(sql, params, cursor)
+        if real_sql is not sql:
+            # The parameters are part of the query already
+            sql, params = real_sql, None
+        else:
+            params = _copy_params(params)
+
+        hub.add_breadcrumb(
+            Breadcrumb(
+                category="query", formatter=partial(_format_sql_breadcrumb, sql, params)
+            )
+        )
+
+
+# The number of parameter sets of an `executemany` call that are sent
+EXECUTEMANY_SAMPLE_SIZE = 10
+
+
+class _SampledParamList(object):
+    """Passes the parameter sets of an `executemany` call through while
+    counting them and keeping the first few."""
+
+    def __init__(self, param_list):
+        # type: (Any) -> None
+        self._iter = iter(param_list)
+        self.count = 0
+        self.sample = []  # type: List[Any]
+        # The first parameter set as passed, for `_mogrify_sql`
+        self.first = None  # type: Any
+
+    def __iter__(self):
+        # type: () -> _SampledParamList
+        return self
+
+    def __next__(self):
+        # type: () -> Any
+        params = next(self._iter)
+        if not self.count:
+            self.first = params
+        if self.count < EXECUTEMANY_SAMPLE_SIZE:
+            self.sample.append(_copy_params(params))
+        self.count += 1
+        return params
+
+    next = __next__
+
+
+def _format_sql_many_breadcrumb(sql, message_sql, sample, count, duration):
+    # type: (Any, Any, List[Any], int, float) -> Optional[Dict[str, Any]]
+    if message_sql is not sql:
+        rv = _format_sql_breadcrumb(message_sql, None)
+    else:
+        rv = _format_sql_breadcrumb(sql, sample[0] if sample else None)
+    if rv is None:
+        return None
+
+    params = []
+    for item in sample:
         with capture_internal_exceptions():
-            hub.add_breadcrumb(message=real_sql, category="query")
+            params.append(format_sql(sql, item)[1])
+
+    rv["data"] = {"rowcount": count, "params": params, "duration": duration}
+    return rv
+
+
+def record_many_sql(sql, param_list, cursor=None, duration=None):
+    # type: (Any, Any, Any, Optional[float]) -> None
+    """Records an `executemany` call as a single breadcrumb.  `param_list`
+    is either the sequence of parameter sets or a `_SampledParamList` that
+    was passed through in its place."""
+    hub = Hub.current
+    if hub.get_integration(DjangoIntegration) is None:
+        return
+
+    with capture_internal_exceptions():
+        if isinstance(param_list, _SampledParamList):
+            first = param_list.first
+            sample = param_list.sample
+            count = param_list.count
+        else:
+            first = param_list[0] if param_list else None
+            sample = [
+                _copy_params(params) for params in param_list[:EXECUTEMANY_SAMPLE_SIZE]
+            ]
+            count = len(param_list)
+
+        message_sql = _mogrify_sql(sql, first, cursor)
+        hub.add_breadcrumb(
+            Breadcrumb(
+                category="query",
+                formatter=partial(
+                    _format_sql_many_breadcrumb,
+                    sql,
+                    message_sql,
+                    sample,
+                    count,
+                    duration,
+                ),
+            )
+        )
 
 
 def install_sql_hook():
@@ -371,10 +528,6 @@ def install_sql_hook():
         # This won't work on Django versions < 1.6
         return
 
-    def record_many_sql(sql, param_list, cursor):
-        for params in param_list:
-            record_sql(sql, params, cursor)
-
     def execute(self, sql, params=None):
         try:
             return real_execute(self, sql, params)
@@ -382,10 +535,14 @@ def install_sql_hook():
             record_sql(sql, params, self.cursor)
 
     def executemany(self, sql, param_list):
+        if not isinstance(param_list, (list, tuple)):
+            # Count iterators as the database consumes them
+            param_list = _SampledParamList(param_list)
+        start = time()
         try:
             return real_executemany(self, sql, param_list)
         finally:
-            record_many_sql(sql, param_list, self.cursor)
+            record_many_sql(sql, param_list, self.cursor, time() - start)
 
     CursorWrapper.execute = execute
     CursorWrapper.executemany = executemany
@@ -1,7 +1,7 @@
 import sys
 
 from sentry_sdk.hub import Hub
-from sentry_sdk.utils import capture_internal_exceptions, event_from_exception
+from sentry_sdk.utils import capture_internal_exceptions
 from sentry_sdk.integrations import Integration
 
 if False:
@@ -37,12 +37,10 @@ def _make_excepthook(old_excepthook):
 
         if integration is not None and _should_send(integration.always_run):
             with capture_internal_exceptions():
-                event, hint = event_from_exception(
+                hub.capture_exception(
                     (exctype, value, traceback),
-                    client_options=hub.client.options,
                     mechanism={"type": "excepthook", "handled": False},
                 )
-                hub.capture_event(event, hint=hint)
 
         return old_excepthook(exctype, value, traceback)
 
@@ -6,7 +6,7 @@ from sentry_sdk.hub import Hub
 from sentry_sdk.integrations import Integration
 from sentry_sdk.integrations._wsgi_common import RequestExtractor
 from sentry_sdk.integrations.wsgi import SentryWsgiMiddleware
-from sentry_sdk.utils import capture_internal_exceptions, event_from_exception
+from sentry_sdk.utils import capture_internal_exceptions
 
 if False:
     from typing import Any
@@ -122,12 +122,7 @@ def _patch_handle_exception():
         integration = hub.get_integration(FalconIntegration)
 
         if integration is not None and not _is_falcon_http_error(ex):
-            event, hint = event_from_exception(
-                ex,
-                client_options=hub.client.options,
-                mechanism={"type": "falcon", "handled": False},
-            )
-            hub.capture_event(event, hint=hint)
+            hub.capture_exception(ex, mechanism={"type": "falcon", "handled": False})
 
         return was_handled
 
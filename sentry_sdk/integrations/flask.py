@@ -3,7 +3,7 @@ from __future__ import absolute_import
 import weakref
 
 from sentry_sdk.hub import Hub, _should_send_default_pii
-from sentry_sdk.utils import capture_internal_exceptions, event_from_exception
+from sentry_sdk.utils import capture_internal_exceptions
 from sentry_sdk.integrations import Integration
 from sentry_sdk.integrations.wsgi import SentryWsgiMiddleware
 from sentry_sdk.integrations._wsgi_common import RequestExtractor
@@ -176,13 +176,7 @@ def _capture_exception(sender, exception, **kwargs):
     hub = Hub.current
     if hub.get_integration(FlaskIntegration) is None:
         return
-    event, hint = event_from_exception(
-        exception,
-        client_options=hub.client.options,
-        mechanism={"type": "flask", "handled": False},
-    )
-
-    hub.capture_event(event, hint=hint)
+    hub.capture_exception(exception, mechanism={"type": "flask", "handled": False})
 
 
 def _add_user_to_event(event):
@@ -3,26 +3,43 @@ from __future__ import absolute_import
 import logging
 import datetime
 
+from functools import partial
+
+from sentry_sdk.consts import DEFAULT_OPTIONS
 from sentry_sdk.hub import Hub
+from sentry_sdk.scope import Breadcrumb
 from sentry_sdk.utils import (
     to_string,
-    event_from_exception,
-    current_stacktrace,
+    current_frames,
+    stacktrace_from_frames,
+    budget_from_options,
+    frame_window_from_options,
     capture_internal_exceptions,
+    event_from_exception,
+    resolve_pending_frames,
 )
 from sentry_sdk.integrations import Integration
+from sentry_sdk.worker import BackgroundWorker
 
 if False:
     from logging import LogRecord
     from typing import Any
     from typing import Dict
+    from typing import List
     from typing import Optional
+    from typing import Tuple
+
+    from sentry_sdk.utils import PendingFrame
 
 DEFAULT_LEVEL = logging.INFO
 DEFAULT_EVENT_LEVEL = logging.ERROR
 
 _IGNORED_LOGGERS = set(["sentry_sdk.errors"])
 
+# The lowest level any `LoggingIntegration` handles records at.  Records
+# below it are skipped before the hub is even looked at.
+_min_level = [float("inf")]  # type: List[float]
+
 
 def ignore_logger(name):
     # type: (str) -> None
@@ -36,16 +53,35 @@ def ignore_logger(name):
 class LoggingIntegration(Integration):
     identifier = "logging"
 
-    def __init__(self, level=DEFAULT_LEVEL, event_level=DEFAULT_EVENT_LEVEL):
-        # type: (int, int) -> None
+    def __init__(
+        self,
+        level=DEFAULT_LEVEL,  # type: int
+        event_level=DEFAULT_EVENT_LEVEL,  # type: int
+        queue_size=None,  # type: Optional[int]
+    ):
+        # type: (...) -> None
+        """Records at `level` and above become breadcrumbs, records at
+        `event_level` and above are sent as events.
+
+        If `queue_size` is set the events are built on a background thread
+        and at most `queue_size` records wait for it; further records are
+        dropped.
+        """
         self._handler = None
         self._breadcrumb_handler = None
 
         if level is not None:
             self._breadcrumb_handler = BreadcrumbHandler(level=level)
+            _min_level[0] = min(_min_level[0], self._breadcrumb_handler.level)
 
         if event_level is not None:
-            self._handler = EventHandler(level=event_level)
+            self._handler = EventHandler(level=event_level, queue_size=queue_size)
+            _min_level[0] = min(_min_level[0], self._handler.level)
+
+    def flush(self, timeout):
+        # type: (float) -> None
+        if self._handler is not None:
+            self._handler.flush(timeout)
 
     def _handle_record(self, record):
         # type: (LogRecord) -> None
@@ -72,7 +108,10 @@ class LoggingIntegration(Integration):
                 # the integration.  Otherwise we have a high chance of getting
                 # into a recursion error when the integration is resolved
                 # (this also is slower).
-                if record.name not in _IGNORED_LOGGERS:
+                if (
+                    record.levelno >= _min_level[0]
+                    and record.name not in _IGNORED_LOGGERS
+                ):
                     integration = Hub.current.get_integration(LoggingIntegration)
                     if integration is not None:
                         integration._handle_record(record)
@@ -86,15 +125,22 @@ def _can_record(record):
 
 
 def _breadcrumb_from_record(record):
-    # type: (LogRecord) -> Dict[str, Any]
-    return {
-        "ty": "log",
-        "level": _logging_to_event_level(record.levelname),
-        "category": record.name,
-        "message": record.message,
-        "timestamp": datetime.datetime.fromtimestamp(record.created),
-        "data": _extra_from_record(record),
-    }
+    # type: (LogRecord) -> Breadcrumb
+    # Only copies of the fields are kept, the record itself may hold a
+    # traceback with all its frames.
+    return Breadcrumb(
+        level=_logging_to_event_level(record.levelname),
+        category=record.name,
+        message=record.message,
+        data=_extra_from_record(record),
+        created=record.created,
+        formatter=partial(_format_breadcrumb, record.created),
+    )
+
+
+def _format_breadcrumb(created):
+    # type: (float) -> Dict[str, Any]
+    return {"ty": "log", "timestamp": datetime.datetime.fromtimestamp(created)}
 
 
 def _logging_to_event_level(levelname):
@@ -141,55 +187,152 @@ def _extra_from_record(record):
 
 
 class EventHandler(logging.Handler, object):
+    def __init__(self, level=logging.NOTSET, queue_size=None):
+        # type: (int, Optional[int]) -> None
+        logging.Handler.__init__(self, level)
+        self._worker = None  # type: Optional[BackgroundWorker]
+        if queue_size is not None:
+            self._worker = BackgroundWorker(queue_size=queue_size)
+
     def emit(self, record):
         # type: (LogRecord) -> Any
         with capture_internal_exceptions():
             self.format(record)
             return self._emit(record)
 
+    def flush(self, timeout=DEFAULT_OPTIONS["shutdown_timeout"]):
+        # type: (float) -> None
+        """Waits up to `timeout` seconds for queued records to be
+        captured."""
+        if self._worker is not None:
+            self._worker.flush(timeout)
+
     def _emit(self, record):
         # type: (LogRecord) -> None
         if not _can_record(record):
             return
 
         hub = Hub.current
-        if hub.client is None:
+        client = hub.client
+        if client is None:
             return
 
-        hint = None  # type: Optional[Dict[str, Any]]
-        client_options = hub.client.options
+        # Don't bother building the event while the transport drops it.
+        if client.transport is not None and client.transport.is_rate_limited():
+            return
 
         # exc_info might be None or (None, None, None)
+        stack = None
+        if record.exc_info and record.exc_info[0] is None:
+            stack = current_frames()
+
+        if self._worker is None:
+            self._capture(hub, record, stack)
+            return
+
+        # Walk the stack and take a snapshot of the locals while they are
+        # still what they were at the logging call.  Reading the source
+        # context and serializing the locals is left to the worker.
+        pending = []  # type: List[PendingFrame]
+        exception = None
+        stacktrace = None
         if record.exc_info is not None and record.exc_info[0] is not None:
-            event, hint = event_from_exception(
+            exception = event_from_exception(
                 record.exc_info,
-                client_options=client_options,
-                mechanism={"type": "logging", "handled": True},
+                client_options=client.options,
+                mechanism=_MECHANISM,
+                pending=pending,
             )
-        elif record.exc_info and record.exc_info[0] is None:
-            event = {}
-            hint = None
+        elif stack is not None:
+            stacktrace = _stacktrace_from_frames(client, stack, pending)
+
+        # Capture with a copy of the current scope, which is cheap
+        self._worker.submit(
+            partial(
+                self._capture_queued, Hub(hub), record, exception, stacktrace, pending
+            ),
+            level=_logging_to_event_level(record.levelname),
+        )
+
+    def _capture(self, hub, record, stack):
+        # type: (Hub, LogRecord, Optional[List[Tuple[Any, int]]]) -> None
+        client = hub.client
+        if client is None:
+            return
+
+        event = _event_from_record(record)
+
+        if record.exc_info is not None and record.exc_info[0] is not None:
+            # Let the client decide whether to send the event before the
+            # stacktrace is serialized.
+            hub.capture_exception(record.exc_info, mechanism=_MECHANISM, event=event)
+            return
+
+        if stack is not None:
             with capture_internal_exceptions():
-                event["threads"] = {
-                    "values": [
-                        {
-                            "stacktrace": current_stacktrace(
-                                client_options["with_locals"]
-                            ),
-                            "crashed": False,
-                            "current": True,
-                        }
-                    ]
-                }
-        else:
-            event = {}
-
-        event["level"] = _logging_to_event_level(record.levelname)
-        event["logger"] = record.name
-        event["logentry"] = {"message": to_string(record.msg), "params": record.args}
-        event["extra"] = _extra_from_record(record)
-
-        hub.capture_event(event, hint=hint)
+                event["threads"] = _current_thread(
+                    _stacktrace_from_frames(client, stack)
+                )
+
+        hub.capture_event(event)
+
+    def _capture_queued(
+        self,
+        hub,  # type: Hub
+        record,  # type: LogRecord
+        exception,  # type: Optional[Tuple[Dict[str, Any], Dict[str, Any]]]
+        stacktrace,  # type: Optional[Dict[str, Any]]
+        pending,  # type: List[PendingFrame]
+    ):
+        # type: (...) -> None
+        client = hub.client
+        if client is None:
+            return
+
+        with capture_internal_exceptions():
+            resolve_pending_frames(pending, client.options)
+
+        event = _event_from_record(record)
+
+        if exception is not None:
+            rv, hint = exception
+            rv.update(event)
+            hub.capture_event(rv, hint)
+            return
+
+        if stacktrace is not None:
+            event["threads"] = _current_thread(stacktrace)
+
+        hub.capture_event(event)
+
+
+_MECHANISM = {"type": "logging", "handled": True}
+
+
+def _event_from_record(record):
+    # type: (LogRecord) -> Dict[str, Any]
+    return {
+        "level": _logging_to_event_level(record.levelname),
+        "logger": record.name,
+        "logentry": {"message": to_string(record.msg), "params": record.args},
+        "extra": _extra_from_record(record),
+    }
+
+
+def _stacktrace_from_frames(client, stack, pending=None):
+    # type: (Any, List[Tuple[Any, int]], Optional[List[PendingFrame]]) -> Dict[str, Any]
+    return stacktrace_from_frames(
+        stack,
+        client.options["with_locals"],
+        budget_from_options(client.options),
+        frame_window_from_options(client.options),
+        pending,
+    )
+
+
+def _current_thread(stacktrace):
+    # type: (Dict[str, Any]) -> Dict[str, Any]
+    return {"values": [{"stacktrace": stacktrace, "crashed": False, "current": True}]}
 
 
 # Legacy name
@@ -1,5 +1,8 @@
 from __future__ import absolute_import
 
+import re
+import hashlib
+
 from sentry_sdk.hub import Hub
 from sentry_sdk.integrations import Integration
 from sentry_sdk.scope import add_global_event_processor
@@ -7,14 +10,43 @@ from sentry_sdk.scope import add_global_event_processor
 if False:
     from typing import Any
     from typing import Dict
+    from typing import Optional
     from typing import Tuple
     from typing import Iterator
 
 _installed_modules = None
+_installed_modules_hash = None
+
+
+def _normalize_module_name(name):
+    # type: (str) -> str
+    # The same keys as `pkg_resources` uses
+    return re.sub(r"[^A-Za-z0-9.]+", "-", name).lower()
 
 
 def _generate_installed_modules():
     # type: () -> Iterator[Tuple[str, str]]
+    try:
+        from importlib import metadata as importlib_metadata  # type: ignore
+    except ImportError:
+        try:
+            import importlib_metadata  # type: ignore
+        except ImportError:
+            importlib_metadata = None
+
+    if importlib_metadata is not None:
+        seen = set()
+        for dist in importlib_metadata.distributions():
+            name = dist.metadata["Name"]
+            if not name:
+                continue
+            key = _normalize_module_name(name)
+            # Earlier entries of `sys.path` take precedence
+            if key not in seen:
+                seen.add(key)
+                yield key, dist.version
+        return
+
     try:
         import pkg_resources
     except ImportError:
@@ -32,15 +64,45 @@ def _get_installed_modules():
     return _installed_modules
 
 
+def _get_installed_modules_hash():
+    # type: () -> str
+    global _installed_modules_hash
+    if _installed_modules_hash is None:
+        h = hashlib.sha1()
+        for item in sorted(_get_installed_modules().items()):
+            h.update(("%s==%s\n" % item).encode("utf-8"))
+        _installed_modules_hash = h.hexdigest()
+    return _installed_modules_hash
+
+
 class ModulesIntegration(Integration):
+    """Sends the installed modules with the first event of a client.  All
+    events reference the list by its hash in the `modules` context.
+    """
+
     identifier = "modules"
 
+    def __init__(self):
+        # type: () -> None
+        self._sent = False
+
+    def event_accepted(self, event):
+        # type: (Dict[str, Any]) -> None
+        # Dropped events, e.g. by `before_send`, do not count
+        if "modules" in event:
+            self._sent = True
+
     @staticmethod
     def setup_once():
         # type: () -> None
         @add_global_event_processor
         def processor(event, hint):
             # type: (Dict[str, Any], Dict[str, Any]) -> Dict[str, Any]
-            if Hub.current.get_integration(ModulesIntegration) is not None:
-                event["modules"] = dict(_get_installed_modules())
+            integration = Hub.current.get_integration(ModulesIntegration)
+            if integration is not None:
+                if not integration._sent:
+                    event["modules"] = dict(_get_installed_modules())
+                event.setdefault("contexts", {})["modules"] = {
+                    "hash": _get_installed_modules_hash()
+                }
             return event
@@ -8,7 +8,7 @@ from pyramid.httpexceptions import HTTPException  # type: ignore
 from pyramid.request import Request  # type: ignore
 
 from sentry_sdk.hub import Hub, _should_send_default_pii
-from sentry_sdk.utils import capture_internal_exceptions, event_from_exception
+from sentry_sdk.utils import capture_internal_exceptions
 from sentry_sdk._compat import reraise
 
 from sentry_sdk.integrations import Integration
@@ -106,13 +106,7 @@ def _capture_exception(exc_info, **kwargs):
     hub = Hub.current
     if hub.get_integration(PyramidIntegration) is None:
         return
-    event, hint = event_from_exception(
-        exc_info,
-        client_options=hub.client.options,
-        mechanism={"type": "pyramid", "handled": False},
-    )
-
-    hub.capture_event(event, hint=hint)
+    hub.capture_exception(exc_info, mechanism={"type": "pyramid", "handled": False})
 
 
 class PyramidRequestExtractor(RequestExtractor):
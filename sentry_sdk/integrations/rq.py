@@ -4,7 +4,7 @@ import weakref
 
 from sentry_sdk.hub import Hub
 from sentry_sdk.integrations import Integration
-from sentry_sdk.utils import capture_internal_exceptions, event_from_exception
+from sentry_sdk.utils import capture_internal_exceptions
 
 from rq.timeouts import JobTimeoutException  # type: ignore
 from rq.worker import Worker  # type: ignore
@@ -95,10 +95,4 @@ def _capture_exception(exc_info, **kwargs):
     hub = Hub.current
     if hub.get_integration(RqIntegration) is None:
         return
-    event, hint = event_from_exception(
-        exc_info,
-        client_options=hub.client.options,
-        mechanism={"type": "rq", "handled": False},
-    )
-
-    hub.capture_event(event, hint=hint)
+    hub.capture_exception(exc_info, mechanism={"type": "rq", "handled": False})
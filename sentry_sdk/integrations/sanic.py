@@ -4,11 +4,7 @@ from inspect import isawaitable
 
 from sentry_sdk._compat import urlparse, reraise
 from sentry_sdk.hub import Hub
-from sentry_sdk.utils import (
-    capture_internal_exceptions,
-    event_from_exception,
-    HAS_REAL_CONTEXTVARS,
-)
+from sentry_sdk.utils import capture_internal_exceptions, HAS_REAL_CONTEXTVARS
 from sentry_sdk.integrations import Integration
 from sentry_sdk.integrations._wsgi_common import RequestExtractor, _filter_headers
 from sentry_sdk.integrations.logging import ignore_logger
@@ -134,12 +130,7 @@ def _capture_exception(exception):
         return
 
     with capture_internal_exceptions():
-        event, hint = event_from_exception(
-            exception,
-            client_options=hub.client.options,
-            mechanism={"type": "sanic", "handled": False},
-        )
-        hub.capture_event(event, hint=hint)
+        hub.capture_exception(exception, mechanism={"type": "sanic", "handled": False})
 
 
 def _make_request_processor(weak_request):
@@ -2,7 +2,6 @@ import functools
 import sys
 
 from sentry_sdk.hub import Hub
-from sentry_sdk.utils import event_from_exception
 from sentry_sdk._compat import reraise
 
 
@@ -34,12 +33,9 @@ def _capture_and_reraise():
     exc_info = sys.exc_info()
     hub = Hub.current
     if hub is not None and hub.client is not None:
-        event, hint = event_from_exception(
-            exc_info,
-            client_options=hub.client.options,
-            mechanism={"type": "serverless", "handled": False},
+        hub.capture_exception(
+            exc_info, mechanism={"type": "serverless", "handled": False}
         )
-        hub.capture_event(event, hint=hint)
 
     reraise(*exc_info)
 
@@ -1,11 +1,6 @@
+from sentry_sdk._compat import PY2
 from sentry_sdk.hub import Hub
-from sentry_sdk.integrations import Integration
-
-
-try:
-    from httplib import HTTPConnection  # type: ignore
-except ImportError:
-    from http.client import HTTPConnection
+from sentry_sdk.integrations import Integration, when_imported
 
 
 class StdlibIntegration(Integration):
@@ -14,11 +9,16 @@ class StdlibIntegration(Integration):
     @staticmethod
     def setup_once():
         # type: () -> None
-        install_httplib()
+        when_imported("httplib" if PY2 else "http.client", lambda _: install_httplib())
 
 
 def install_httplib():
     # type: () -> None
+    try:
+        from httplib import HTTPConnection  # type: ignore
+    except ImportError:
+        from http.client import HTTPConnection
+
     real_putrequest = HTTPConnection.putrequest
     real_getresponse = HTTPConnection.getresponse
 
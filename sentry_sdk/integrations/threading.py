@@ -6,7 +6,6 @@ from threading import Thread
 
 from sentry_sdk import Hub
 from sentry_sdk._compat import reraise
-from sentry_sdk.utils import event_from_exception
 from sentry_sdk.integrations import Integration
 
 
@@ -54,11 +53,8 @@ def _capture_exception():
     exc_info = sys.exc_info()
 
     if hub.get_integration(ThreadingIntegration) is not None:
-        event, hint = event_from_exception(
-            exc_info,
-            client_options=hub.client.options,
-            mechanism={"type": "threading", "handled": False},
+        hub.capture_exception(
+            exc_info, mechanism={"type": "threading", "handled": False}
         )
-        hub.capture_event(event, hint=hint)
 
     return exc_info
@@ -4,7 +4,6 @@ from inspect import iscoroutinefunction
 from sentry_sdk.hub import Hub, _should_send_default_pii
 from sentry_sdk.utils import (
     HAS_REAL_CONTEXTVARS,
-    event_from_exception,
     capture_internal_exceptions,
     transaction_from_function,
 )
@@ -108,14 +107,10 @@ def _capture_exception(ty, value, tb):
     if isinstance(value, HTTPError):
         return
 
-    event, hint = event_from_exception(
-        (ty, value, tb),
-        client_options=hub.client.options,
-        mechanism={"type": "tornado", "handled": False},
+    hub.capture_exception(
+        (ty, value, tb), mechanism={"type": "tornado", "handled": False}
     )
 
-    hub.capture_event(event, hint=hint)
-
 
 def _make_event_processor(weak_handler):
     # type: (Callable[[], RequestHandler]) -> Callable
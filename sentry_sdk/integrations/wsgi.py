@@ -1,7 +1,7 @@
 import sys
 
 from sentry_sdk.hub import Hub, _should_send_default_pii
-from sentry_sdk.utils import capture_internal_exceptions, event_from_exception
+from sentry_sdk.utils import capture_internal_exceptions
 from sentry_sdk._compat import PY2, reraise
 from sentry_sdk.tracing import SpanContext
 from sentry_sdk.integrations._wsgi_common import _filter_headers
@@ -154,12 +154,7 @@ def _capture_exception(hub):
     # Check client here as it might have been unset while streaming response
     if hub.client is not None:
         exc_info = sys.exc_info()
-        event, hint = event_from_exception(
-            exc_info,
-            client_options=hub.client.options,
-            mechanism={"type": "wsgi", "handled": False},
-        )
-        hub.capture_event(event, hint=hint)
+        hub.capture_exception(exc_info, mechanism={"type": "wsgi", "handled": False})
     return exc_info
 
 
@@ -1,7 +1,10 @@
 from copy import copy
 from collections import deque
+from datetime import datetime
+from time import time
 from functools import wraps
 from itertools import chain
+from threading import Lock
 
 from sentry_sdk.utils import logger, capture_internal_exceptions, object_to_json
 
@@ -12,10 +15,82 @@ if False:
     from typing import Optional
     from typing import Deque
     from typing import List
+    from typing import Union
 
 
 global_event_processors = []
 
+# The breadcrumb keys `Breadcrumb` keeps in slots
+_BREADCRUMB_FIELDS = ("type", "category", "message", "level", "data", "timestamp")
+
+
+class Breadcrumb(object):
+    """A breadcrumb as recorded by `Hub.add_breadcrumb`.  The fields are
+    kept in slots, the dictionary the protocol expects is only built when
+    the breadcrumb is attached to an event.
+
+    The optional `formatter` is called at that point and returns values to
+    add to the breadcrumb, or `None` to drop it.
+    """
+
+    __slots__ = _BREADCRUMB_FIELDS + ("other", "created", "formatter")
+
+    def __init__(
+        self,
+        type=None,  # type: Optional[str]
+        category=None,  # type: Optional[str]
+        message=None,  # type: Optional[str]
+        level=None,  # type: Optional[str]
+        data=None,  # type: Optional[Any]
+        timestamp=None,  # type: Optional[Any]
+        created=None,  # type: Optional[float]
+        formatter=None,  # type: Optional[Callable]
+    ):
+        # type: (...) -> None
+        self.type = type
+        self.category = category
+        self.message = message
+        self.level = level
+        self.data = data
+        self.timestamp = timestamp
+        # Keys the protocol has no field for, only set when there are any
+        self.other = None  # type: Optional[Dict[str, Any]]
+        self.created = time() if created is None else created
+        self.formatter = formatter
+
+    @classmethod
+    def from_dict(cls, values):
+        # type: (Dict[str, Any]) -> Breadcrumb
+        rv = cls()
+        for key, value in values.items():
+            if key in _BREADCRUMB_FIELDS:
+                setattr(rv, key, value)
+            else:
+                if rv.other is None:
+                    rv.other = {}
+                rv.other[key] = value
+        return rv
+
+    def to_dict(self):
+        # type: () -> Optional[Dict[str, Any]]
+        rv = dict(self.other or ())
+        for key in _BREADCRUMB_FIELDS:
+            value = getattr(self, key)
+            if value is not None:
+                rv[key] = value
+        if self.formatter is not None:
+            formatted = None
+            with capture_internal_exceptions():
+                formatted = self.formatter()
+            if formatted is None:
+                return None
+            rv.update(formatted)
+        if rv.get("timestamp") is None:
+            rv["timestamp"] = datetime.utcfromtimestamp(self.created)
+        if rv.get("type") is None:
+            rv["type"] = "default"
+        return rv
+
 
 def add_global_event_processor(processor):
     # type: (Callable) -> None
@@ -41,6 +116,34 @@ def _disable_capture(fn):
     return wrapper
 
 
+_PROCESSORS = frozenset(("_event_processors", "_error_processors"))
+_CLEARED = frozenset(("_tags", "_contexts", "_extras", "_breadcrumbs"))
+_NOTHING_OWNED = frozenset()  # type: frozenset
+
+# Held while a scope is copied or takes over containers
+_ownership_lock = Lock()
+
+
+class _Ownership(object):
+    """The containers a scope may modify in place.  Copying the scope
+    revokes it, which is never undone, so the copied scope itself is not
+    changed.  Scopes replace their ownership instead of modifying it.
+    """
+
+    __slots__ = ("names", "revoked")
+
+    def __init__(self, names):
+        # type: (frozenset) -> None
+        self.names = names
+        self.revoked = False
+
+    def owned(self):
+        # type: () -> frozenset
+        if self.revoked:
+            return _NOTHING_OWNED
+        return self.names
+
+
 class Scope(object):
     """The scope holds extra information that should be sent with all
     events that belong to it.
@@ -60,11 +163,13 @@ class Scope(object):
         "_error_processors",
         "_should_capture",
         "_span",
+        "_ownership",
     )
 
     def __init__(self):
         self._event_processors = []  # type: List[Callable]
         self._error_processors = []  # type: List[Callable]
+        self._ownership = _Ownership(_PROCESSORS)
 
         self._name = None
         self.clear()
@@ -93,28 +198,45 @@ class Scope(object):
         """Sets the span context."""
         self._span = span_context
 
+    def _own(self, name):
+        # type: (str) -> None
+        """Copies a container shared with other scopes before it is
+        modified."""
+        if name not in self._ownership.owned():
+            with _ownership_lock:
+                owned = self._ownership.owned()
+                if name not in owned:
+                    setattr(self, name, copy(getattr(self, name)))
+                    self._ownership = _Ownership(owned.union((name,)))
+
     def set_tag(self, key, value):
         """Sets a tag for a key to a specific value."""
+        self._own("_tags")
         self._tags[key] = value
 
     def remove_tag(self, key):
         """Removes a specific tag."""
+        self._own("_tags")
         self._tags.pop(key, None)
 
     def set_context(self, key, value):
         """Binds a context at a certain key to a specific value."""
+        self._own("_contexts")
         self._contexts[key] = value
 
     def remove_context(self, key):
         """Removes a context."""
+        self._own("_contexts")
         self._contexts.pop(key, None)
 
     def set_extra(self, key, value):
         """Sets an extra key to a specific value."""
+        self._own("_extras")
         self._extras[key] = value
 
     def remove_extra(self, key):
         """Removes a specific extra key."""
+        self._own("_extras")
         self._extras.pop(key, None)
 
     def clear(self):
@@ -125,11 +247,14 @@ class Scope(object):
         self._transaction = None
         self._user = None
 
-        self._tags = {}  # type: Dict[str, Any]
-        self._contexts = {}  # type: Dict[str, Dict]
-        self._extras = {}  # type: Dict[str, Any]
+        with _ownership_lock:
+            self._tags = {}  # type: Dict[str, Any]
+            self._contexts = {}  # type: Dict[str, Dict]
+            self._extras = {}  # type: Dict[str, Any]
+            # Sized to `max_breadcrumbs` on the first breadcrumb
+            self._breadcrumbs = deque()  # type: Deque[Union[Breadcrumb, Dict]]
+            self._ownership = _Ownership(self._ownership.owned().union(_CLEARED))
 
-        self.clear_breadcrumbs()
         self._should_capture = True
 
         self._span = None
@@ -137,7 +262,23 @@ class Scope(object):
     def clear_breadcrumbs(self):
         # type: () -> None
         """Clears breadcrumb buffer."""
-        self._breadcrumbs = deque()  # type: Deque[Dict]
+        with _ownership_lock:
+            self._breadcrumbs = deque()
+            owned = self._ownership.owned()
+            self._ownership = _Ownership(owned.union(("_breadcrumbs",)))
+
+    def _add_breadcrumb(self, crumb, max_breadcrumbs):
+        # type: (Union[Breadcrumb, Dict[str, Any]], int) -> None
+        # A full buffer drops its oldest breadcrumb on append
+        if (
+            "_breadcrumbs" not in self._ownership.owned()
+            or self._breadcrumbs.maxlen != max_breadcrumbs
+        ):
+            with _ownership_lock:
+                owned = self._ownership.owned()
+                self._breadcrumbs = deque(self._breadcrumbs, maxlen=max_breadcrumbs)
+                self._ownership = _Ownership(owned.union(("_breadcrumbs",)))
+        self._breadcrumbs.append(crumb)
 
     def add_event_processor(self, func):
         # type: (Callable) -> None
@@ -145,6 +286,7 @@ class Scope(object):
 
         This function behaves like `before_send.`
         """
+        self._own("_event_processors")
         self._event_processors.append(func)
 
     def add_error_processor(self, func, cls=None):
@@ -166,6 +308,7 @@ class Scope(object):
                     return real_func(event, exc_info)
                 return event
 
+        self._own("_error_processors")
         self._error_processors.append(func)
 
     @_disable_capture
@@ -181,7 +324,13 @@ class Scope(object):
         if self._level is not None:
             event["level"] = self._level
 
-        event.setdefault("breadcrumbs", []).extend(self._breadcrumbs)
+        breadcrumbs = event.setdefault("breadcrumbs", [])
+        for crumb in self._breadcrumbs:
+            if isinstance(crumb, Breadcrumb):
+                crumb = crumb.to_dict()
+                if crumb is None:
+                    continue
+            breadcrumbs.append(crumb)
         if event.get("user") is None and self._user is not None:
             event["user"] = self._user
 
@@ -226,6 +375,8 @@ class Scope(object):
 
     def __copy__(self):
         # type: () -> Scope
+        """Creates a copy that shares the containers of this scope until
+        either of them modifies one."""
         rv = object.__new__(self.__class__)
 
         rv._level = self._level
@@ -234,13 +385,16 @@ class Scope(object):
         rv._transaction = self._transaction
         rv._user = self._user
 
-        rv._tags = dict(self._tags)
-        rv._contexts = dict(self._contexts)
-        rv._extras = dict(self._extras)
+        with _ownership_lock:
+            rv._tags = self._tags
+            rv._contexts = self._contexts
+            rv._extras = self._extras
 
-        rv._breadcrumbs = copy(self._breadcrumbs)
-        rv._event_processors = list(self._event_processors)
-        rv._error_processors = list(self._error_processors)
+            rv._breadcrumbs = self._breadcrumbs
+            rv._event_processors = self._event_processors
+            rv._error_processors = self._error_processors
+            self._ownership.revoked = True
+        rv._ownership = _Ownership(_NOTHING_OWNED)
 
         rv._should_capture = self._should_capture
         rv._span = self._span
@@ -0,0 +1,183 @@
+"""
+A segmented, append-only on-disk log for payloads that could not be sent.
+
+Each record is a one byte kind, a four byte big endian length and the
+payload itself.  Records are appended to the newest segment file; once a
+segment grows past `segment_bytes` a new one is started.  Whole segments are
+evicted when the spool grows past `max_bytes` or when they are older than
+`max_age` seconds.
+"""
+import os
+import mmap
+import struct
+
+from threading import Lock
+from time import time
+
+from sentry_sdk.utils import logger
+
+if False:
+    from typing import Callable
+    from typing import Dict
+    from typing import List
+    from typing import Optional
+
+
+_HEADER = struct.Struct(">cI")
+_SUFFIX = ".spool"
+
+
+class Spool(object):
+    def __init__(
+        self,
+        directory,  # type: str
+        max_bytes=50 * 1024 * 1024,  # type: int
+        max_age=24 * 60 * 60,  # type: float
+        segment_bytes=1024 * 1024,  # type: int
+        use_mmap=False,  # type: bool
+    ):
+        # type: (...) -> None
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.segment_bytes = segment_bytes
+        self.use_mmap = use_mmap
+        self._lock = Lock()
+        # Segment name -> size.  Loaded lazily so that creating a spool does
+        # not touch the disk.
+        self._segments = None  # type: Optional[Dict[str, int]]
+        self._active = None  # type: Optional[str]
+        # Replay progress of partially sent segments.
+        self._offsets = {}  # type: Dict[str, int]
+
+    def _load(self):
+        # type: () -> Dict[str, int]
+        if self._segments is None:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            segments = {}
+            for name in os.listdir(self.directory):
+                if name.endswith(_SUFFIX):
+                    try:
+                        segments[name] = os.path.getsize(self._path(name))
+                    except OSError:
+                        pass
+            self._segments = segments
+        return self._segments
+
+    def _path(self, name):
+        # type: (str) -> str
+        return os.path.join(self.directory, name)
+
+    def _new_segment(self):
+        # type: () -> str
+        segments = self._load()
+        seq = int(time() * 1000)
+        if segments:
+            seq = max(seq, int(max(segments)[: -len(_SUFFIX)]) + 1)
+        name = "%020d%s" % (seq, _SUFFIX)
+        segments[name] = 0
+        return name
+
+    def _remove(self, name):
+        # type: (str) -> None
+        self._load().pop(name, None)
+        self._offsets.pop(name, None)
+        if name == self._active:
+            self._active = None
+        try:
+            os.remove(self._path(name))
+        except OSError:
+            pass
+
+    def _evict(self):
+        # type: () -> None
+        segments = self._load()
+        cutoff = time() - self.max_age
+        for name in sorted(segments):
+            if name == self._active:
+                continue
+            try:
+                expired = os.path.getmtime(self._path(name)) < cutoff
+            except OSError:
+                expired = True
+            if expired:
+                logger.debug("Evicting expired spool segment %s", name)
+                self._remove(name)
+
+        names = sorted(segments)
+        while names and sum(segments.values()) > self.max_bytes:
+            logger.debug("Spool is full, evicting segment %s", names[0])
+            self._remove(names.pop(0))
+
+    def append(self, kind, payload):
+        # type: (bytes, bytes) -> None
+        """Appends a payload of the given one byte kind."""
+        with self._lock:
+            segments = self._load()
+            if self._active is None or segments[self._active] >= self.segment_bytes:
+                self._active = self._new_segment()
+            with open(self._path(self._active), "ab") as f:
+                f.write(_HEADER.pack(kind, len(payload)))
+                f.write(payload)
+            segments[self._active] += _HEADER.size + len(payload)
+            self._evict()
+
+    def has_data(self):
+        # type: () -> bool
+        with self._lock:
+            return any(self._load().values())
+
+    def _read(self, name):
+        # type: (str) -> bytes
+        with open(self._path(name), "rb") as f:
+            if self.use_mmap:
+                try:
+                    m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:
+                    # empty file
+                    return b""
+                return m  # type: ignore
+            return f.read()
+
+    def replay(self, send):
+        # type: (Callable[[bytes, bytes], bool]) -> bool
+        """Calls `send` with the kind and payload of every spooled record,
+        oldest first.  When `send` returns `False` replaying stops and the
+        remaining records are kept for the next attempt.  Returns `True` if
+        the spool was drained completely.
+        """
+        with self._lock:
+            # New records go to a new segment while we replay.
+            self._active = None
+            names = sorted(self._load())  # type: List[str]
+
+        for name in names:
+            try:
+                data = self._read(name)
+            except (IOError, OSError):
+                # evicted in the meantime
+                continue
+
+            try:
+                offset = self._offsets.get(name, 0)
+                while offset + _HEADER.size <= len(data):
+                    kind, length = _HEADER.unpack(data[offset : offset + _HEADER.size])
+                    start = offset + _HEADER.size
+                    payload = data[start : start + length]
+                    if len(payload) < length:
+                        # truncated by a crash while writing
+                        break
+                    if not send(kind, payload):
+                        with self._lock:
+                            self._offsets[name] = offset
+                        return False
+                    offset = start + length
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
+
+            with self._lock:
+                self._remove(name)
+
+        return True
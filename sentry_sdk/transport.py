@@ -2,31 +2,41 @@ from __future__ import print_function
 
 import json
 import io
-import urllib3  # type: ignore
-import certifi
 import gzip
 
 from datetime import datetime, timedelta
+from threading import Event, Lock
 
+from sentry_sdk._compat import string_types, text_type
 from sentry_sdk.consts import VERSION
 from sentry_sdk.utils import Dsn, logger, capture_internal_exceptions
+from sentry_sdk.spool import Spool
 from sentry_sdk.worker import BackgroundWorker
 
 if False:
     from sentry_sdk.consts import ClientOptions
+    from sentry_sdk.hub import Hub
     from typing import Type
     from typing import Any
     from typing import Optional
     from typing import Dict
+    from typing import List
     from typing import Union
     from typing import Callable
+    from typing import Tuple
     from urllib3.poolmanager import PoolManager  # type: ignore
     from urllib3.poolmanager import ProxyManager  # type: ignore
 
-try:
-    from urllib.request import getproxies
-except ImportError:
-    from urllib import getproxies  # type: ignore
+
+def getproxies():
+    # type: () -> Dict[str, str]
+    # `urllib.request` pulls in `http.client`, `ssl` and `email`, so it is
+    # only imported once a transport actually resolves its proxies.
+    try:
+        from urllib.request import getproxies as _getproxies
+    except ImportError:
+        from urllib import getproxies as _getproxies  # type: ignore
+    return _getproxies()
 
 
 class Transport(object):
@@ -47,10 +57,29 @@ class Transport(object):
 
     def capture_event(self, event):
         """This gets invoked with the event dictionary when an event should
-        be sent to sentry.
+        be sent to sentry.  It may return `False` if the event was dropped
+        right away, for instance because the queue is full.
         """
         raise NotImplementedError()
 
+    def capture_deferred_event(self, event, prepare):
+        # type: (Dict[str, Any], Callable[[], Optional[Dict[str, Any]]]) -> None
+        """Like `capture_event` but the event is only complete once
+        `prepare` was called, which returns the final event or `None` if it
+        was dropped.  Transports that send from a background thread call it
+        there.
+        """
+        event = prepare()  # type: ignore
+        if event is not None:
+            self.capture_event(event)
+
+    def is_rate_limited(self):
+        # type: () -> bool
+        """Returns `True` while events handed to the transport would be
+        discarded anyway, so that callers can skip building them.
+        """
+        return False
+
     def flush(self, timeout, callback=None):
         """Wait `timeout` seconds for the current events to be sent out."""
         pass
@@ -74,50 +103,68 @@ class HttpTransport(Transport):
     def __init__(self, options):
         # type: (ClientOptions) -> None
         Transport.__init__(self, options)
-        self._worker = BackgroundWorker()
+        self._worker = BackgroundWorker(
+            queue_size=options["transport_queue_size"],
+            queue_bytes=options["transport_queue_bytes"],
+            overflow_policy=options["transport_queue_overflow"],
+            batch_callback=self._send_batch,
+            batch_size=options["transport_batch_size"],
+            batch_timeout=options["transport_batch_timeout"],
+            num_threads=options["transport_num_threads"],
+        )
         self._auth = self.parsed_dsn.to_auth("sentry.python/%s" % VERSION)
         self._disabled_until = None  # type: Optional[datetime]
-        self._retry = urllib3.util.Retry()
         self.options = options
 
-        self._pool = self._make_pool(
-            self.parsed_dsn,
-            http_proxy=options["http_proxy"],
-            https_proxy=options["https_proxy"],
-            ca_certs=options["ca_certs"],
-        )
+        # urllib3 and the connection pool are only set up for the first
+        # request, usually on a worker thread, to keep `init()` fast.
+        self._pool_lock = Lock()
+        self._pool_and_retry = None  # type: Optional[Tuple[Any, Any]]
 
-        from sentry_sdk import Hub
+        from sentry_sdk import hub
 
-        self.hub_cls = Hub
+        self.hub_cls = hub.Hub
 
-    def _send_event(self, event):
-        # type: (Dict[str, Any]) -> None
+        self._spool = None  # type: Optional[Spool]
+        self._killed = False
+        if options["spool_dir"]:
+            self._spool = Spool(
+                options["spool_dir"],
+                max_bytes=options["spool_max_bytes"],
+                max_age=options["spool_max_age"],
+                use_mmap=options["spool_mmap"],
+            )
+            self._replay_worker = BackgroundWorker(queue_size=1)
+            self._replay_wakeup = Event()
+            # Set while the replay thread waits for new spooled events
+            self._replay_idle = False
+            # Pick up whatever a previous process left behind, otherwise
+            # the replay thread is started by the first send.
+            if self._spool.has_data():
+                self._ensure_replay_thread()
+
+    def _check_disabled(self):
+        # type: () -> bool
         if self._disabled_until is not None:
             if datetime.utcnow() < self._disabled_until:
-                return
+                return True
             self._disabled_until = None
+        return False
 
-        body = io.BytesIO()
-        with gzip.GzipFile(fileobj=body, mode="w") as f:
-            f.write(json.dumps(event, allow_nan=False).encode("utf-8"))
+    def is_rate_limited(self):
+        # type: () -> bool
+        # With a spool events are kept for later instead of being dropped.
+        return self._spool is None and self._check_disabled()
 
-        logger.debug(
-            "Sending %s event [%s] to %s project:%s"
-            % (
-                event.get("level") or "error",
-                event["event_id"],
-                self.parsed_dsn.host,
-                self.parsed_dsn.project_id,
-            )
-        )
+    def _send_request(self, url, body, content_type):
+        # type: (str, bytes, str) -> int
         response = self._pool.request(
             "POST",
-            str(self._auth.store_api_url),
-            body=body.getvalue(),
+            url,
+            body=body,
             headers={
                 "X-Sentry-Auth": str(self._auth.to_header()),
-                "Content-Type": "application/json",
+                "Content-Type": content_type,
                 "Content-Encoding": "gzip",
             },
         )
@@ -127,7 +174,7 @@ class HttpTransport(Transport):
                 self._disabled_until = datetime.utcnow() + timedelta(
                     seconds=self._retry.get_retry_after(response) or 60
                 )
-                return
+                return response.status
 
             elif response.status >= 300 or response.status < 200:
                 logger.error(
@@ -139,11 +186,197 @@ class HttpTransport(Transport):
             response.close()
 
         self._disabled_until = None
+        return response.status
+
+    def _deliver(self, kind, body):
+        # type: (bytes, bytes) -> None
+        """Sends a store (`b"s"`) or envelope (`b"e"`) body.  With a spool
+        configured, bodies that cannot be delivered right now are written to
+        disk instead of being discarded."""
+        if self._check_disabled():
+            if self._spool is not None:
+                self._spool_body(kind, body)
+            return
+
+        try:
+            delivered = self._send_spoolable(kind, body)
+        except Exception:
+            if self._spool is None:
+                raise
+            logger.debug("Failed to send event, spooling it", exc_info=True)
+            delivered = False
+
+        if self._spool is not None:
+            if not delivered:
+                self._spool_body(kind, body)
+            elif self._spool.has_data():
+                # We are back online, drain the spool right away.
+                self._ensure_replay_thread()
+                self._replay_wakeup.set()
+
+    def _spool_body(self, kind, body):
+        # type: (bytes, bytes) -> None
+        self._spool.append(kind, body)  # type: ignore
+        self._ensure_replay_thread()
+        if self._replay_idle:
+            self._replay_wakeup.set()
+
+    def _send_spoolable(self, kind, body):
+        # type: (bytes, bytes) -> bool
+        if kind == b"e":
+            url = str(self._auth.envelope_api_url)
+            content_type = "application/x-sentry-envelope"
+        else:
+            url = str(self._auth.store_api_url)
+            content_type = "application/json"
+        status = self._send_request(url, body, content_type)
+        # Anything but rate limits and server errors is final.
+        return status != 429 and status < 500
+
+    def _ensure_replay_thread(self):
+        # type: () -> None
+        if not self._replay_worker.is_alive:
+            self._replay_worker.submit(self._replay)
+
+    def _replay(self):
+        # type: () -> None
+        """Runs on its own thread for the lifetime of the transport and
+        drains the spool whenever Sentry is reachable."""
+        spool = self._spool  # type: Any
+        backoff = 1.0
+        while not self._killed:
+            self._replay_wakeup.clear()
+            timeout = None  # type: Optional[float]
+            try:
+                # A successful send may reset it at any time
+                disabled_until = self._disabled_until
+                now = datetime.utcnow()
+                if disabled_until is not None and now < disabled_until:
+                    timeout = (disabled_until - now).total_seconds()
+                elif spool.has_data():
+                    if spool.replay(self._send_spoolable):
+                        backoff = 1.0
+                    else:
+                        timeout = backoff
+                        backoff = min(backoff * 2, 60.0)
+            except Exception:
+                logger.debug("Failed to replay spooled events", exc_info=True)
+                timeout = backoff
+                backoff = min(backoff * 2, 60.0)
+
+            # Without a timeout there is nothing to do until an event is
+            # spooled or a send succeeds, which both wake us up.
+            self._replay_idle = timeout is None
+            self._replay_wakeup.wait(None if timeout is None else max(timeout, 0.1))
+
+    def _send_event(self, event):
+        # type: (Dict[str, Any]) -> None
+        if self._check_disabled() and self._spool is None:
+            return
+
+        body = _gzip_json(event)
+
+        logger.debug(
+            "Sending %s event [%s] to %s project:%s"
+            % (
+                event.get("level") or "error",
+                event["event_id"],
+                self.parsed_dsn.host,
+                self.parsed_dsn.project_id,
+            )
+        )
+        self._deliver(b"s", body)
+
+    def _send_envelope(self, events):
+        # type: (List[Dict[str, Any]]) -> None
+        if self._check_disabled() and self._spool is None:
+            return
+
+        # An envelope is a header line followed by one header line and one
+        # payload line per item, all in a single gzip stream.
+        body = io.BytesIO()
+        with gzip.GzipFile(fileobj=body, mode="w") as f:
+            f.write(b"{}\n")
+            for event in events:
+                payload = json.dumps(event, allow_nan=False).encode("utf-8")
+                header = {
+                    "type": "event",
+                    "event_id": event["event_id"],
+                    "length": len(payload),
+                }
+                f.write(json.dumps(header).encode("utf-8"))
+                f.write(b"\n")
+                f.write(payload)
+                f.write(b"\n")
+
+        logger.debug(
+            "Sending %d events to %s project:%s"
+            % (len(events), self.parsed_dsn.host, self.parsed_dsn.project_id)
+        )
+        self._deliver(b"e", body.getvalue())
+
+    def _prepare_item(self, hub, item):
+        # type: (Hub, Any) -> Optional[Dict[str, Any]]
+        if not isinstance(item, _DeferredEvent):
+            return item
+        with hub:
+            with capture_internal_exceptions():
+                return item.prepare()
+        return None
+
+    def _send_batch(self, items):
+        # type: (List[Tuple[Hub, Any]]) -> None
+        hub = items[-1][0]
+        events = []
+        for item_hub, item in items:
+            event = self._prepare_item(item_hub, item)
+            if event is not None:
+                events.append(event)
+        if not events:
+            return
+        with hub:
+            with capture_internal_exceptions():
+                if len(events) == 1:
+                    self._send_event(events[0])
+                else:
+                    self._send_envelope(events)
+
+    def _get_pool_and_retry(self):
+        # type: () -> Tuple[Any, Any]
+        rv = self._pool_and_retry
+        if rv is None:
+            with self._pool_lock:
+                rv = self._pool_and_retry
+                if rv is None:
+                    import urllib3  # type: ignore
+
+                    pool = self._make_pool(
+                        self.parsed_dsn,
+                        http_proxy=self.options["http_proxy"],
+                        https_proxy=self.options["https_proxy"],
+                        ca_certs=self.options["ca_certs"],
+                    )
+                    rv = self._pool_and_retry = (pool, urllib3.util.Retry())
+        return rv
+
+    @property
+    def _pool(self):
+        # type: () -> Union[PoolManager, ProxyManager]
+        return self._get_pool_and_retry()[0]
+
+    @property
+    def _retry(self):
+        # type: () -> Any
+        return self._get_pool_and_retry()[1]
 
     def _get_pool_options(self, ca_certs):
         # type: (Optional[Any]) -> Dict[str, Any]
+        import certifi
+
         return {
             "num_pools": 2,
+            # One keep-alive connection per sender thread
+            "maxsize": max(self.options["transport_num_threads"], 1),
             "cert_reqs": "CERT_REQUIRED",
             "ca_certs": ca_certs or certifi.where(),
         }
@@ -156,16 +389,9 @@ class HttpTransport(Transport):
         ca_certs,  # type: Optional[Any]
     ):
         # type: (...) -> Union[PoolManager, ProxyManager]
-        proxy = None
-
-        # try HTTPS first
-        if parsed_dsn.scheme == "https" and (https_proxy != ""):
-            proxy = https_proxy or getproxies().get("https")
-
-        # maybe fallback to HTTP proxy
-        if not proxy and (http_proxy != ""):
-            proxy = http_proxy or getproxies().get("http")
+        import urllib3  # type: ignore
 
+        proxy = _get_proxy(parsed_dsn, http_proxy, https_proxy)
         opts = self._get_pool_options(ca_certs)
 
         if proxy:
@@ -173,17 +399,48 @@ class HttpTransport(Transport):
         else:
             return urllib3.PoolManager(**opts)
 
+    @property
+    def dropped_events(self):
+        # type: () -> int
+        """The number of events dropped because the queue was full."""
+        return self._worker.dropped_events
+
+    @property
+    def queued_events(self):
+        # type: () -> int
+        """The number of events waiting to be sent."""
+        return self._worker.queued_events
+
+    @property
+    def in_flight_events(self):
+        # type: () -> int
+        """The number of events (or batches of events) currently being
+        sent."""
+        return self._worker.in_flight_events
+
     def capture_event(self, event):
-        # type: (Dict[str, Any]) -> None
+        # type: (Dict[str, Any]) -> bool
+        return self._submit(event, event)
+
+    def capture_deferred_event(self, event, prepare):
+        # type: (Dict[str, Any], Callable[[], Optional[Dict[str, Any]]]) -> None
+        self._submit(event, _DeferredEvent(prepare))
+
+    def _submit(self, event, item):
+        # type: (Dict[str, Any], Any) -> bool
         hub = self.hub_cls.current
 
-        def send_event_wrapper():
-            # type: () -> None
-            with hub:
-                with capture_internal_exceptions():
-                    self._send_event(event)
+        size = 0
+        if self.options["transport_queue_bytes"]:
+            size = _estimate_event_size(event)
 
-        self._worker.submit(send_event_wrapper)
+        key = None
+        if self.options["transport_num_threads"] > 1:
+            key = _issue_key(event)
+
+        return self._worker.submit(
+            (hub, item), size=size, level=event.get("level"), key=key
+        )
 
     def flush(self, timeout, callback=None):
         # type: (float, Optional[Any]) -> None
@@ -194,9 +451,98 @@ class HttpTransport(Transport):
     def kill(self):
         # type: () -> None
         logger.debug("Killing HTTP transport")
+        self._killed = True
+        if self._spool is not None:
+            # Keep what could not be sent in time for the next process.
+            for hub, item in self._worker.drain():
+                event = self._prepare_item(hub, item)
+                if event is not None:
+                    with capture_internal_exceptions():
+                        self._spool.append(b"s", _gzip_json(event))
+            self._replay_wakeup.set()
+            self._replay_worker.kill()
         self._worker.kill()
 
 
+def _get_proxy(parsed_dsn, http_proxy, https_proxy):
+    # type: (Dsn, Optional[str], Optional[str]) -> Optional[str]
+    proxy = None
+
+    # try HTTPS first
+    if parsed_dsn.scheme == "https" and (https_proxy != ""):
+        proxy = https_proxy or getproxies().get("https")
+
+    # maybe fallback to HTTP proxy
+    if not proxy and (http_proxy != ""):
+        proxy = http_proxy or getproxies().get("http")
+
+    return proxy
+
+
+class _DeferredEvent(object):
+    __slots__ = ("prepare",)
+
+    def __init__(self, prepare):
+        # type: (Callable[[], Optional[Dict[str, Any]]]) -> None
+        self.prepare = prepare
+
+
+def _gzip_json(obj):
+    # type: (Any) -> bytes
+    body = io.BytesIO()
+    with gzip.GzipFile(fileobj=body, mode="w") as f:
+        f.write(json.dumps(obj, allow_nan=False).encode("utf-8"))
+    return body.getvalue()
+
+
+def _issue_key(event):
+    # type: (Dict[str, Any]) -> Optional[Any]
+    """Returns a cheap approximation of the issue an event will be grouped
+    into, so that events of the same issue are sent in order."""
+    fingerprint = event.get("fingerprint")
+    if fingerprint:
+        return tuple(fingerprint)
+    exceptions = (event.get("exception") or {}).get("values")
+    if exceptions:
+        return (exceptions[-1].get("module"), exceptions[-1].get("type"))
+    message = event.get("message")
+    if message is None:
+        # Events of the logging integration only have the unformatted
+        # message, which is what they are grouped by anyway.
+        message = (event.get("logentry") or {}).get("message")
+    if message is None:
+        return None
+    return (event.get("logger"), message)
+
+
+def _estimate_event_size(event):
+    # type: (Dict[str, Any]) -> int
+    """Cheaply approximates the size of the JSON payload of an event without
+    serializing it.
+    """
+    rv = 0
+    stack = [event]  # type: List[Any]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, dict):
+            rv += 2
+            for key, value in obj.items():
+                # Keys of other types are stringified by the serializer
+                if not isinstance(key, string_types):
+                    key = text_type(key)
+                rv += len(key) + 4
+                stack.append(value)
+        elif isinstance(obj, (list, tuple)):
+            rv += 2 + len(obj)
+            stack.extend(obj)
+        elif isinstance(obj, string_types):
+            rv += len(obj) + 2
+        else:
+            # numbers, booleans and null
+            rv += 8
+    return rv
+
+
 class _FunctionTransport(Transport):
     def __init__(self, func):
         # type: (Callable[[Dict[str, Any]], None]) -> None
@@ -2,9 +2,13 @@ import os
 import sys
 import linecache
 import logging
+import weakref
 
+from collections import OrderedDict
 from contextlib import contextmanager
 from datetime import datetime
+from threading import Lock
+from time import time
 
 from sentry_sdk._compat import (
     urlparse,
@@ -51,11 +55,118 @@ logger = logging.getLogger("sentry_sdk.errors")
 CYCLE_MARKER = object()
 
 
-global_repr_processors = []
+class _ReprProcessorList(list):
+    """The registered repr processors.  Changing the list in place
+    invalidates the processors cached per type."""
 
 
-def add_global_repr_processor(processor):
+def _invalidating(name):
+    # type: (str) -> Any
+    method = getattr(list, name)
+
+    def wrapper(self, *args):
+        # type: (Any, *Any) -> Any
+        rv = method(self, *args)
+        _repr_processor_version[0] += 1
+        return rv
+
+    wrapper.__name__ = name
+    return wrapper
+
+
+for _name in (
+    "append",
+    "extend",
+    "insert",
+    "remove",
+    "pop",
+    "clear",
+    "sort",
+    "reverse",
+    "__setitem__",
+    "__delitem__",
+    "__iadd__",
+    "__imul__",
+    "__setslice__",
+    "__delslice__",
+):
+    if hasattr(list, _name):
+        setattr(_ReprProcessorList, _name, _invalidating(_name))
+del _name
+
+
+global_repr_processors = _ReprProcessorList()
+
+# The types each processor is restricted to, processors without an entry
+# are called for all values.
+_repr_processor_types = {}  # type: Dict[Any, Tuple[type, ...]]
+
+# Concrete class -> processors that apply to it, in registration order.
+# Every change to the registered processors bumps the version, which
+# invalidates it.  The list itself and its length are compared too, in case
+# the list was replaced.
+_repr_processor_cache = {}  # type: Dict[type, List[Any]]
+_repr_processor_version = [0]
+_repr_processor_cache_key = [None]  # type: List[Any]
+
+
+def add_global_repr_processor(processor, types=None):
+    # type: (Any, Optional[Tuple[type, ...]]) -> Any
+    """Registers a function that is called with a value and a hint dict
+    before the value is serialized into a local variable or extra.  It
+    returns the JSON compatible representation or `NotImplemented`.  If
+    `types` is given it is only called for instances of those types.
+
+    Without `types` the processor is called for every value, including
+    numbers and strings, which are otherwise serialized without calling
+    any processor.
+    """
+    if types is not None:
+        _repr_processor_types[processor] = tuple(types)
     global_repr_processors.append(processor)
+    _repr_processor_version[0] += 1
+    return processor
+
+
+def remove_global_repr_processor(processor):
+    # type: (Any) -> None
+    """Unregisters a function added with `add_global_repr_processor`."""
+    global_repr_processors.remove(processor)
+    _repr_processor_types.pop(processor, None)
+    _repr_processor_version[0] += 1
+
+
+def _get_repr_processors(cls):
+    # type: (type) -> List[Any]
+    key = _repr_processor_cache_key[0]
+    if (
+        key is None
+        or key[0] != _repr_processor_version[0]
+        or key[1] is not global_repr_processors
+        or key[2] != len(global_repr_processors)
+    ):
+        _repr_processor_cache.clear()
+        _repr_processor_cache_key[0] = (
+            _repr_processor_version[0],
+            global_repr_processors,
+            len(global_repr_processors),
+        )
+
+    try:
+        return _repr_processor_cache[cls]
+    except KeyError:
+        pass
+
+    rv = []
+    for processor in global_repr_processors:
+        types = _repr_processor_types.get(processor)
+        if types is None or issubclass(cls, types):
+            rv.append(processor)
+
+    if len(_repr_processor_cache) > 1000:
+        _repr_processor_cache.clear()
+    _repr_processor_cache[cls] = rv
+    return rv
 
 
 def _get_debug_hub():
@@ -188,6 +299,16 @@ class Auth(object):
             self.project_id,
         )
 
+    @property
+    def envelope_api_url(self):
+        """Returns the API url for sending envelopes."""
+        return "%s://%s%sapi/%s/envelope/" % (
+            self.scheme,
+            self.host,
+            self.path,
+            self.project_id,
+        )
+
     def to_header(self, timestamp=None):
         """Returns the auth header a string."""
         rv = [("sentry_key", self.public_key), ("sentry_version", self.version)]
@@ -213,15 +334,65 @@ def get_type_module(cls):
     return None
 
 
+class _CodeInfo(object):
+    """The attributes of a serialized frame that only depend on the code
+    object and the module it runs in."""
+
+    __slots__ = ("module", "filename", "abs_path", "function", "flag_names")
+
+    def __init__(self, f_code, module):
+        # type: (Any, Optional[str]) -> None
+        self.module = module
+        if f_code is not None:
+            abs_path = f_code.co_filename
+            self.function = f_code.co_name
+            # Locals can only hold a traceback hide flag if the code uses it
+            names = set(f_code.co_varnames + f_code.co_cellvars + f_code.co_names)
+            self.flag_names = tuple(
+                name for name in _HIDE_FLAG_NAMES if name in names
+            )  # type: Tuple[str, ...]
+        else:
+            abs_path = None
+            self.function = None
+            self.flag_names = _HIDE_FLAG_NAMES
+        self.filename = filename_for_module(module, abs_path) or None
+        self.abs_path = os.path.abspath(abs_path) if abs_path else None
+
+
+_HIDE_FLAG_NAMES = ("__traceback_hide__", "__tracebackhide__")
+_code_info_cache = weakref.WeakKeyDictionary()  # type: weakref.WeakKeyDictionary
+
+
+def get_code_info(frame):
+    # type: (Any) -> _CodeInfo
+    try:
+        module = frame.f_globals["__name__"]
+    except Exception:
+        module = None
+    f_code = getattr(frame, "f_code", None)
+    if f_code is None:
+        return _CodeInfo(None, module)
+
+    info = _code_info_cache.get(f_code)
+    # The same code object may run with other globals through `exec`
+    if info is None or info.module != module:
+        info = _CodeInfo(f_code, module)
+        try:
+            _code_info_cache[f_code] = info
+        except TypeError:
+            pass
+    return info
+
+
 def should_hide_frame(frame):
     # type: (Any) -> bool
+    info = get_code_info(frame)
     try:
-        mod = frame.f_globals["__name__"]
-        return mod.startswith("sentry_sdk.")
-    except (AttributeError, KeyError):
+        return info.module.startswith("sentry_sdk.")  # type: ignore
+    except AttributeError:
         pass
 
-    for flag_name in "__traceback_hide__", "__tracebackhide__":
+    for flag_name in info.flag_names:
         try:
             if frame.f_locals[flag_name]:
                 return True
@@ -248,6 +419,104 @@ def slim_string(value, length=512):
     return value[:length]
 
 
+class SourceCache(object):
+    """A bounded LRU cache of source files, split into lines that are
+    already stripped and shortened for use as source context.
+
+    Entries are keyed by file name and module and are reloaded when the
+    size or modification time of the file (or of the zip archive it was
+    imported from) changes.
+    """
+
+    def __init__(self, maxsize=128):
+        # type: (int) -> None
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._entries = OrderedDict()  # type: OrderedDict
+
+    def __len__(self):
+        # type: () -> int
+        return len(self._entries)
+
+    @property
+    def stats(self):
+        # type: () -> Dict[str, int]
+        return {"hits": self.hits, "misses": self.misses, "size": len(self)}
+
+    def clear(self):
+        # type: () -> None
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def invalidate(self, filename):
+        # type: (str) -> None
+        """Forgets the cached lines of the given file."""
+        with self._lock:
+            for key in list(self._entries):
+                if key[0] == filename:
+                    del self._entries[key]
+
+    def get_lines(self, filename, loader=None, module=None):
+        # type: (str, Any, Optional[str]) -> List[str]
+        key = (filename, module)
+        stamp = _file_stamp(filename, loader)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None and entry[0] == stamp:
+                self._entries[key] = entry
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        lines = [
+            slim_string(line.strip("\r\n"))
+            for line in _load_source(filename, loader, module)
+        ]
+
+        with self._lock:
+            self._entries[key] = (stamp, lines)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return lines
+
+
+def _file_stamp(filename, loader):
+    # type: (str, Any) -> Optional[Tuple[float, int]]
+    # Zipimported modules have no file of their own, use the archive
+    for path in filename, getattr(loader, "archive", None):
+        if path:
+            try:
+                st = os.stat(path)
+            except (OSError, IOError, TypeError, ValueError):
+                continue
+            return st.st_mtime, st.st_size
+    return None
+
+
+def _load_source(filename, loader, module):
+    # type: (str, Any, Optional[str]) -> List[str]
+    if loader is not None and hasattr(loader, "get_source"):
+        try:
+            source_str = loader.get_source(module)
+        except (ImportError, IOError):
+            source_str = None
+        if source_str is not None:
+            return source_str.splitlines()
+
+    try:
+        # linecache keeps its own copy, make sure it is not stale
+        linecache.checkcache(filename)
+        return linecache.getlines(filename)
+    except (OSError, IOError):
+        return []
+
+
+source_cache = SourceCache()
+
+
 def get_lines_from_file(
     filename,  # type: str
     lineno,  # type: int
@@ -256,20 +525,7 @@ def get_lines_from_file(
 ):
     # type: (...) -> Tuple[List[str], Optional[str], List[str]]
     context_lines = 5
-    source = None
-    if loader is not None and hasattr(loader, "get_source"):
-        try:
-            source_str = loader.get_source(module)
-        except (ImportError, IOError):
-            source_str = None
-        if source_str is not None:
-            source = source_str.splitlines()
-
-    if source is None:
-        try:
-            source = linecache.getlines(filename)
-        except (OSError, IOError):
-            return [], None, []
+    source = source_cache.get_lines(filename, loader, module)
 
     if not source:
         return [], None, []
@@ -278,14 +534,9 @@ def get_lines_from_file(
     upper_bound = min(lineno + 1 + context_lines, len(source))
 
     try:
-        pre_context = [
-            slim_string(line.strip("\r\n")) for line in source[lower_bound:lineno]
-        ]
-        context_line = slim_string(source[lineno].strip("\r\n"))
-        post_context = [
-            slim_string(line.strip("\r\n"))
-            for line in source[(lineno + 1) : upper_bound]
-        ]
+        pre_context = source[lower_bound:lineno]
+        context_line = source[lineno]
+        post_context = source[(lineno + 1) : upper_bound]
         return pre_context, context_line, post_context
     except IndexError:
         # the file may have changed since it was loaded into memory
@@ -320,13 +571,85 @@ def safe_str(value):
         return safe_repr(value)
 
 
+# Reprs are cut off a bit past the length `strip_string` keeps, so that the
+# stripped value is still annotated as such.
+MAX_REPR_LENGTH = 1024
+
+# How deep `bounded_repr` descends into nested builtin containers
+_MAX_REPR_DEPTH = 6
+
+
+def _repr_items(items, limit, depth, is_dict=False):
+    # type: (Iterator[Any], int, int, bool) -> str
+    """Joins the reprs of `items` until about `limit` characters are
+    reached."""
+    parts = []  # type: List[str]
+    length = 0
+    for item in items:
+        if parts:
+            parts.append(", ")
+            length += 2
+        if length >= limit:
+            parts.append("...")
+            break
+        if is_dict:
+            key = bounded_repr(item[0], limit - length, depth + 1)
+            part = (
+                key + ": " + bounded_repr(item[1], limit - length - len(key), depth + 1)
+            )
+        else:
+            part = bounded_repr(item, limit - length, depth + 1)
+        parts.append(part)
+        length += len(part)
+    return "".join(parts)
+
+
+_REPR_BRACKETS = {
+    list: ("[", "]"),
+    tuple: ("(", ")"),
+    set: ("{", "}"),
+    frozenset: ("frozenset({", "})"),
+    dict: ("{", "}"),
+}
+
+
+def bounded_repr(value, limit=MAX_REPR_LENGTH, depth=0):
+    # type: (Any, int, int) -> str
+    """Like `repr` but stops producing output for builtin strings and
+    containers after about `limit` characters, so that huge values are never
+    represented in full."""
+    ty = type(value)
+    if ty in string_types or ty is bytes:
+        if len(value) > limit:
+            return repr(value[:limit]) + "..."
+        return repr(value)
+
+    brackets = _REPR_BRACKETS.get(ty)
+    if brackets is not None and value:
+        if depth >= _MAX_REPR_DEPTH or limit <= 0:
+            return "..."
+        if ty is dict:
+            inner = _repr_items(iter(value.items()), limit, depth, is_dict=True)
+        else:
+            inner = _repr_items(iter(value), limit, depth)
+            if ty is tuple and len(value) == 1:
+                inner += ","
+        return brackets[0] + inner + brackets[1]
+
+    return repr(value)
+
+
 def safe_repr(value):
     # type: (Any) -> str
     try:
-        rv = repr(value)
+        rv = bounded_repr(value)
         if isinstance(rv, bytes):
             rv = rv.decode("utf-8", "replace")
 
+        # Without backslashes there are no escape codes to decode
+        if "\\" not in rv:
+            return rv
+
         # At this point `rv` contains a bunch of literal escape codes, like
         # this (exaggerated example):
         #
@@ -348,8 +671,71 @@ def safe_repr(value):
         return u"<broken repr>"
 
 
-def object_to_json(obj, remaining_depth=4, memo=None):
+class SerializationBudget(object):
+    """Limits the work spent on serializing local variables for one event
+    by the number of objects visited, the size of the produced reprs and
+    the time taken.  `None` disables a limit.  Once a limit is hit the
+    budget stays exhausted.
+    """
+
+    __slots__ = (
+        "max_objects",
+        "max_bytes",
+        "deadline",
+        "objects",
+        "bytes",
+        "exhausted",
+    )
+
+    def __init__(self, max_objects=None, max_bytes=None, max_time=None):
+        # type: (Optional[int], Optional[int], Optional[float]) -> None
+        self.max_objects = max_objects
+        self.max_bytes = max_bytes
+        self.deadline = time() + max_time if max_time is not None else None
+        self.objects = 0
+        self.bytes = 0
+        self.exhausted = False
+
+    def spend(self, objects=0, nbytes=0):
+        # type: (int, int) -> bool
+        """Accounts for work done and returns whether there is budget
+        left."""
+        if self.exhausted:
+            return False
+        self.objects += objects
+        self.bytes += nbytes
+        if (
+            (self.max_objects is not None and self.objects > self.max_objects)
+            or (self.max_bytes is not None and self.bytes > self.max_bytes)
+            or (self.deadline is not None and time() > self.deadline)
+        ):
+            self.exhausted = True
+        return not self.exhausted
+
+
+def budget_from_options(client_options):
+    # type: (Optional[ClientOptions]) -> Optional[SerializationBudget]
+    if client_options is None:
+        return None
+    return SerializationBudget(
+        max_objects=client_options["max_locals_objects"],
+        max_bytes=client_options["max_locals_bytes"],
+        max_time=client_options["max_locals_time"],
+    )
+
+
+# Stands in for values that were not serialized because the budget ran out
+SKIPPED_VALUE = u"<skipped>"
+
+# Replace the rest of a list or dict once the budget ran out
+TRUNCATED_ITEMS = u"<truncated %d items>"
+TRUNCATED_KEY = u"<truncated>"
+
+
+def object_to_json(obj, remaining_depth=4, memo=None, budget=None):
     with capture_internal_exceptions():
+        if budget is not None and not budget.spend(objects=1):
+            return SKIPPED_VALUE
         if memo is None:
             memo = Memo()
         if memo.memoize(obj):
@@ -357,42 +743,79 @@ def object_to_json(obj, remaining_depth=4, memo=None):
 
         try:
             if remaining_depth > 0:
-                hints = {"memo": memo, "remaining_depth": remaining_depth}
-                for processor in global_repr_processors:
-                    with capture_internal_exceptions():
-                        result = processor(obj, hints)
-                        if result is not NotImplemented:
-                            return result
+                processors = _get_repr_processors(type(obj))
+                if processors:
+                    hints = {
+                        "memo": memo,
+                        "remaining_depth": remaining_depth,
+                        "budget": budget,
+                    }
+                    for processor in processors:
+                        with capture_internal_exceptions():
+                            result = processor(obj, hints)
+                            if result is not NotImplemented:
+                                return result
 
                 if isinstance(obj, (list, tuple)):
                     # It is not safe to iterate over another sequence types as this may raise errors or
                     # bring undesired side-effects (e.g. Django querysets are executed during iteration)
-                    return [
-                        object_to_json(
-                            x, remaining_depth=remaining_depth - 1, memo=memo
+                    rv_list = []
+                    for x in obj:
+                        if budget is not None and budget.exhausted:
+                            rv_list.append(TRUNCATED_ITEMS % (len(obj) - len(rv_list)))
+                            break
+                        rv_list.append(
+                            object_to_json(
+                                x,
+                                remaining_depth=remaining_depth - 1,
+                                memo=memo,
+                                budget=budget,
+                            )
                         )
-                        for x in obj
-                    ]
+                    return rv_list
 
                 if isinstance(obj, Mapping):
-                    return {
-                        safe_str(k): object_to_json(
-                            v, remaining_depth=remaining_depth - 1, memo=memo
+                    rv_dict = {}
+                    for i, (k, v) in enumerate(list(obj.items())):
+                        if budget is not None and budget.exhausted:
+                            rv_dict[TRUNCATED_KEY] = len(obj) - i
+                            break
+                        rv_dict[safe_str(k)] = object_to_json(
+                            v,
+                            remaining_depth=remaining_depth - 1,
+                            memo=memo,
+                            budget=budget,
                         )
-                        for k, v in list(obj.items())
-                    }
+                    return rv_dict
 
-            return safe_repr(obj)
+            rv = safe_repr(obj)
+            if budget is not None:
+                budget.spend(nbytes=len(rv))
+            return rv
         finally:
             memo.unmemoize(obj)
     return u"<broken repr>"
 
 
-def extract_locals(frame):
-    # type: (Any) -> Dict[str, Any]
+def extract_locals(frame, budget=None):
+    # type: (Any, Optional[SerializationBudget]) -> Any
+    return _serialize_locals(frame.f_locals, budget)
+
+
+def _serialize_locals(f_locals, budget=None):
+    # type: (Dict[str, Any], Optional[SerializationBudget]) -> Any
+    if budget is not None and budget.exhausted:
+        # Only report the names of the variables
+        return AnnotatedValue(
+            {str(key): SKIPPED_VALUE for key in f_locals}, {"rem": [["!limit", "x"]]}
+        )
+
     rv = {}
-    for key, value in frame.f_locals.items():
-        rv[str(key)] = object_to_json(value)
+    for key, value in f_locals.items():
+        rv[str(key)] = object_to_json(value, budget=budget)
+
+    if budget is not None and budget.exhausted:
+        return AnnotatedValue(rv, {"rem": [["!limit", "x"]]})
     return rv
 
 
@@ -414,65 +837,271 @@ def filename_for_module(module, abs_path):
         return abs_path
 
 
-def serialize_frame(frame, tb_lineno=None, with_locals=True):
-    # type: (Any, int, bool) -> Dict[str, Any]
-    f_code = getattr(frame, "f_code", None)
-    if f_code:
-        abs_path = frame.f_code.co_filename
-        function = frame.f_code.co_name
-    else:
-        abs_path = None
-        function = None
-    try:
-        module = frame.f_globals["__name__"]
-    except Exception:
-        module = None
+# Locals of these types are immutable and cheap to keep in a snapshot
+_SNAPSHOT_TYPES = frozenset(
+    (type(None), bool, float, complex, bytes, text_type) + tuple(int_types)
+)
+
+
+class _OpaqueValue(object):
+    """Stands in for a local variable that is not kept in a snapshot."""
+
+    __slots__ = ("type_name",)
+
+    def __init__(self, value):
+        # type: (Any) -> None
+        self.type_name = get_type_name(type(value))
+
+    def __repr__(self):
+        # type: () -> str
+        return "<%s>" % (self.type_name,)
+
 
+def snapshot_locals(frame):
+    # type: (Any) -> Dict[str, Any]
+    """Shallowly copies the locals of a frame, replacing every value that
+    is not of an immutable builtin type by a placeholder."""
+    rv = {}
+    for key, value in frame.f_locals.items():
+        if type(value) in _SNAPSHOT_TYPES:
+            rv[key] = value
+        else:
+            rv[key] = _OpaqueValue(value)
+    return rv
+
+
+class PendingFrame(object):
+    """What is needed to fill in the source context and the variables of
+    serialized frames once the frame itself may be gone."""
+
+    __slots__ = ("frames", "abs_path", "loader", "module", "lineno", "f_locals")
+
+    def __init__(self, frame, tb_lineno, f_locals):
+        # type: (Any, int, Optional[Dict[str, Any]]) -> None
+        self.frames = []  # type: List[Dict[str, Any]]
+        try:
+            self.abs_path = frame.f_code.co_filename
+        except Exception:
+            self.abs_path = None
+        try:
+            self.module = frame.f_globals["__name__"]
+        except Exception:
+            self.module = None
+            self.abs_path = None
+        try:
+            self.loader = frame.f_globals["__loader__"]
+        except Exception:
+            self.loader = None
+        self.lineno = tb_lineno
+        self.f_locals = f_locals
+
+
+def resolve_pending_frames(pending, client_options=None):
+    # type: (List[PendingFrame], Optional[ClientOptions]) -> None
+    """Fills in the frames serialized with a `pending` list."""
+    budget = budget_from_options(client_options)
+    serialized_locals = {}  # type: Dict[int, Any]
+    for item in pending:
+        if item.abs_path:
+            pre_context, context_line, post_context = get_lines_from_file(
+                item.abs_path, item.lineno - 1, item.loader, item.module
+            )
+        else:
+            pre_context, context_line, post_context = [], None, []
+
+        f_vars = None
+        if item.f_locals is not None:
+            # Snapshots are shared by all lines of the same frame
+            key = id(item.f_locals)
+            if key not in serialized_locals:
+                serialized_locals[key] = _serialize_locals(item.f_locals, budget)
+            f_vars = serialized_locals[key]
+
+        for rv in item.frames:
+            rv["pre_context"] = pre_context
+            rv["context_line"] = context_line
+            rv["post_context"] = post_context
+            if f_vars is not None:
+                rv["vars"] = f_vars
+
+
+def serialize_frame(
+    frame,  # type: Any
+    tb_lineno=None,  # type: Optional[int]
+    with_locals=True,  # type: bool
+    budget=None,  # type: Optional[SerializationBudget]
+    frame_cache=None,  # type: Optional[Dict[Any, Any]]
+    pending=None,  # type: Optional[List[PendingFrame]]
+):
+    # type: (...) -> Dict[str, Any]
+    """Serializes a frame.  Frames serialized with the same `frame_cache`
+    reuse the work done for the same frame and line, and the locals of the
+    same frame, as chained exceptions usually pass through the same frames.
+
+    With a `pending` list only a snapshot of the locals is taken, and the
+    source context and the variables are left to `resolve_pending_frames`.
+    """
     if tb_lineno is None:
         tb_lineno = frame.f_lineno
 
-    pre_context, context_line, post_context = get_source_context(frame, tb_lineno)
+    # The frames are kept alive by the tracebacks, so their ids are stable
+    if frame_cache is not None:
+        cached = frame_cache.get((id(frame), tb_lineno))
+        if cached is not None:
+            rv = dict(cached)
+            if pending is not None:
+                frame_cache[("pending", id(frame), tb_lineno)].frames.append(rv)
+            return rv
+
+    info = get_code_info(frame)
+    if pending is None:
+        pre_context, context_line, post_context = get_source_context(frame, tb_lineno)
+    else:
+        pre_context, context_line, post_context = [], None, []
 
     rv = {
-        "filename": filename_for_module(module, abs_path) or None,
-        "abs_path": os.path.abspath(abs_path) if abs_path else None,
-        "function": function or "<unknown>",
-        "module": module,
+        "filename": info.filename,
+        "abs_path": info.abs_path,
+        "function": info.function or "<unknown>",
+        "module": info.module,
         "lineno": tb_lineno,
         "pre_context": pre_context,
         "context_line": context_line,
         "post_context": post_context,
     }
-    if with_locals:
-        rv["vars"] = extract_locals(frame)
+    if pending is not None:
+        f_locals = None
+        if with_locals:
+            if frame_cache is None:
+                f_locals = snapshot_locals(frame)
+            else:
+                try:
+                    f_locals = frame_cache[id(frame)]
+                except KeyError:
+                    f_locals = frame_cache[id(frame)] = snapshot_locals(frame)
+        item = PendingFrame(frame, tb_lineno, f_locals)
+        item.frames.append(rv)
+        pending.append(item)
+        if frame_cache is not None:
+            frame_cache[("pending", id(frame), tb_lineno)] = item
+    elif with_locals:
+        if frame_cache is None:
+            rv["vars"] = extract_locals(frame, budget)
+        else:
+            # The locals do not depend on the line
+            try:
+                rv["vars"] = frame_cache[id(frame)]
+            except KeyError:
+                rv["vars"] = frame_cache[id(frame)] = extract_locals(frame, budget)
+
+    if frame_cache is not None:
+        frame_cache[(id(frame), tb_lineno)] = rv
     return rv
 
 
-def stacktrace_from_traceback(tb=None, with_locals=True):
-    # type: (Any, bool) -> Dict[str, List[Dict[str, Any]]]
-    return {
+def frame_window_from_options(client_options):
+    # type: (Optional[ClientOptions]) -> Optional[Tuple[int, int]]
+    if client_options is None:
+        return None
+    head = client_options["stacktrace_head_frames"]
+    tail = client_options["stacktrace_tail_frames"]
+    if head is None or tail is None:
+        return None
+    return head, tail
+
+
+def _window_frames(items, frame_window):
+    # type: (List[Any], Optional[Tuple[int, int]]) -> Tuple[List[Any], Optional[List[int]]]
+    """Keeps the first and last frames of the given window and returns the
+    range of the omitted ones."""
+    if frame_window is None:
+        return items, None
+    head, tail = frame_window
+    if len(items) <= head + tail:
+        return items, None
+    end = len(items) - tail
+    return items[:head] + items[end:], [head, end]
+
+
+def stacktrace_from_traceback(
+    tb=None,  # type: Any
+    with_locals=True,  # type: bool
+    budget=None,  # type: Optional[SerializationBudget]
+    frame_window=None,  # type: Optional[Tuple[int, int]]
+    frame_cache=None,  # type: Optional[Dict[Any, Any]]
+    pending=None,  # type: Optional[List[PendingFrame]]
+):
+    # type: (...) -> Dict[str, Any]
+    tbs, omitted = _window_frames(list(iter_stacks(tb)), frame_window)
+    rv = {
         "frames": [
             serialize_frame(
-                tb.tb_frame, tb_lineno=tb.tb_lineno, with_locals=with_locals
+                tb.tb_frame,
+                tb_lineno=tb.tb_lineno,
+                with_locals=with_locals,
+                budget=budget,
+                frame_cache=frame_cache,
+                pending=pending,
             )
-            for tb in iter_stacks(tb)
+            for tb in tbs
         ]
-    }
+    }  # type: Dict[str, Any]
+    if omitted is not None:
+        rv["frames_omitted"] = omitted
+    return rv
 
 
-def current_stacktrace(with_locals=True):
+def current_frames():
+    # type: () -> List[Tuple[Any, int]]
+    """Returns the frames of the calling thread that are not hidden along
+    with the lines they are currently at, outermost first."""
     __tracebackhide__ = True
     frames = []
 
     f = sys._getframe()
     while f is not None:
         if not should_hide_frame(f):
-            frames.append(serialize_frame(f, with_locals=with_locals))
+            frames.append((f, f.f_lineno))
         f = f.f_back
 
     frames.reverse()
+    return frames
+
+
+def stacktrace_from_frames(
+    frames,  # type: List[Tuple[Any, int]]
+    with_locals=True,  # type: bool
+    budget=None,  # type: Optional[SerializationBudget]
+    frame_window=None,  # type: Optional[Tuple[int, int]]
+    pending=None,  # type: Optional[List[PendingFrame]]
+):
+    # type: (...) -> Dict[str, Any]
+    frames, omitted = _window_frames(frames, frame_window)
+
+    rv = {
+        "frames": [
+            serialize_frame(
+                f, lineno, with_locals=with_locals, budget=budget, pending=pending
+            )
+            for f, lineno in frames
+        ]
+    }  # type: Dict[str, Any]
+    if omitted is not None:
+        rv["frames_omitted"] = omitted
+    return rv
 
-    return {"frames": frames}
+
+def current_stacktrace(
+    with_locals=True,  # type: bool
+    budget=None,  # type: Optional[SerializationBudget]
+    frame_window=None,  # type: Optional[Tuple[int, int]]
+    pending=None,  # type: Optional[List[PendingFrame]]
+):
+    # type: (...) -> Dict[str, Any]
+    __tracebackhide__ = True
+    return stacktrace_from_frames(
+        current_frames(), with_locals, budget, frame_window, pending
+    )
 
 
 def get_errno(exc_value):
@@ -486,6 +1115,9 @@ def single_exception_from_error_tuple(
     tb,  # type: Optional[Any]
     client_options=None,  # type: Optional[ClientOptions]
     mechanism=None,  # type: Dict[str, Any]
+    budget=None,  # type: Optional[SerializationBudget]
+    frame_cache=None,  # type: Optional[Dict[Any, Any]]
+    pending=None,  # type: Optional[List[PendingFrame]]
 ):
     # type: (...) -> Dict[str, Any]
     if exc_value is not None:
@@ -509,7 +1141,14 @@ def single_exception_from_error_tuple(
         "type": get_type_name(exc_type),
         "value": safe_str(exc_value),
         "mechanism": mechanism,
-        "stacktrace": stacktrace_from_traceback(tb, with_locals),
+        "stacktrace": stacktrace_from_traceback(
+            tb,
+            with_locals,
+            budget,
+            frame_window_from_options(client_options),
+            frame_cache,
+            pending,
+        ),
     }
 
 
@@ -559,14 +1198,26 @@ def exceptions_from_error_tuple(
     exc_info,  # type: ExcInfo
     client_options=None,  # type: Optional[ClientOptions]
     mechanism=None,  # type: Dict[str, Any]
+    pending=None,  # type: Optional[List[PendingFrame]]
 ):
     # type: (...) -> List[Dict[str, Any]]
     exc_type, exc_value, tb = exc_info
+    # The budget and serialized frames are shared by all exceptions of the
+    # chain
+    budget = None if pending is not None else budget_from_options(client_options)
+    frame_cache = {}  # type: Dict[Any, Any]
     rv = []
     for exc_type, exc_value, tb in walk_exception_chain(exc_info):
         rv.append(
             single_exception_from_error_tuple(
-                exc_type, exc_value, tb, client_options, mechanism
+                exc_type,
+                exc_value,
+                tb,
+                client_options,
+                mechanism,
+                budget,
+                frame_cache,
+                pending,
             )
         )
 
@@ -616,10 +1267,23 @@ def handle_in_app(event, in_app_exclude=None, in_app_include=None):
     return event
 
 
+_in_app_cache = (
+    {}
+)  # type: Dict[Tuple[Tuple[str, ...], Tuple[str, ...]], Dict[str, Optional[bool]]]
+
+
 def handle_in_app_impl(frames, in_app_exclude, in_app_include):
     if not frames:
         return
 
+    # Module prefix matching is memoized per set of options
+    options_key = (tuple(in_app_include or ()), tuple(in_app_exclude or ()))
+    decisions = _in_app_cache.get(options_key)
+    if decisions is None or len(decisions) > 1000:
+        if len(_in_app_cache) > 10:
+            _in_app_cache.clear()
+        decisions = _in_app_cache[options_key] = {}
+
     any_in_app = False
     for frame in frames:
         in_app = frame.get("in_app")
@@ -631,11 +1295,22 @@ def handle_in_app_impl(frames, in_app_exclude, in_app_include):
         module = frame.get("module")
         if not module:
             continue
-        elif _module_in_set(module, in_app_include):
-            frame["in_app"] = True
-            any_in_app = True
-        elif _module_in_set(module, in_app_exclude):
-            frame["in_app"] = False
+
+        try:
+            in_app = decisions[module]
+        except (KeyError, TypeError):
+            if _module_in_set(module, in_app_include):
+                in_app = True
+            elif _module_in_set(module, in_app_exclude):
+                in_app = False
+            try:
+                decisions[module] = in_app
+            except TypeError:
+                pass
+
+        if in_app is not None:
+            frame["in_app"] = in_app
+            any_in_app = any_in_app or in_app
 
     if not any_in_app:
         for frame in frames:
@@ -671,6 +1346,7 @@ def event_from_exception(
     exc_info,  # type: Union[BaseException, ExcInfo]
     client_options=None,  # type: Optional[ClientOptions]
     mechanism=None,  # type: Dict[str, Any]
+    pending=None,  # type: Optional[List[PendingFrame]]
 ):
     # type: (...) -> Tuple[Dict[str, Any], Dict[str, Any]]
     exc_info = exc_info_from_error(exc_info)
@@ -680,7 +1356,7 @@ def event_from_exception(
             "level": "error",
             "exception": {
                 "values": exceptions_from_error_tuple(
-                    exc_info, client_options, mechanism
+                    exc_info, client_options, mechanism, pending
                 )
             },
         },
@@ -831,6 +1507,15 @@ def strip_databag(obj, remaining_depth=20, max_breadth=20):
         return AnnotatedValue(None, {"rem": [["!limit", "x"]]})
     if isinstance(obj, text_type):
         return strip_string(obj)
+    if isinstance(obj, AnnotatedValue):
+        stripped = strip_databag(
+            obj.value, remaining_depth=remaining_depth, max_breadth=max_breadth
+        )
+        if not isinstance(stripped, AnnotatedValue):
+            return AnnotatedValue(stripped, obj.metadata)
+        metadata = dict(obj.metadata, **stripped.metadata)
+        metadata["rem"] = obj.metadata.get("rem", []) + stripped.metadata.get("rem", [])
+        return AnnotatedValue(stripped.value, metadata)
     if isinstance(obj, Mapping):
         rv_dict = {}  # type: Dict[Any, Any]
         for i, (k, v) in enumerate(obj.items()):
@@ -873,6 +1558,184 @@ def strip_string(value, max_length=512):
     return value
 
 
+# Where `normalize_event` strips data, by the key that leads there.  Integer
+# zones are the remaining depth of a databag.
+_STRIP_ZONES = {
+    "event": {
+        "stacktrace": "stacktrace",
+        "exception": "exception",
+        "request": "request",
+        "breadcrumbs": "breadcrumbs",
+    },
+    "exception": {"values": "exception_values"},
+    "exception_value": {"stacktrace": "stacktrace"},
+    "stacktrace": {"frames": "frames"},
+    "frame": {"vars": 20},
+    "request": {"data": 20},
+}  # type: Dict[str, Dict[str, Any]]
+
+# Zones of list items
+_STRIP_ITEM_ZONES = {
+    "exception_values": "exception_value",
+    "frames": "frame",
+    "breadcrumbs": 20,
+}  # type: Dict[str, Any]
+
+_MAX_BREADTH = 20
+
+
+def _merge_metadata(outer, inner):
+    # type: (Dict[str, Any], Optional[Dict[str, Any]]) -> Dict[str, Any]
+    if inner is None:
+        return outer
+    rv = dict(outer, **inner)
+    rv["rem"] = outer.get("rem", []) + inner.get("rem", [])
+    return rv
+
+
+def _normalize_leaf(value):
+    # type: (Any) -> Any
+    if value is CYCLE_MARKER:
+        return u"<cyclic>"
+    if isinstance(value, datetime):
+        return text_type(value.strftime("%Y-%m-%dT%H:%M:%SZ"))
+    if value is not None and not isinstance(value, string_types + number_types):
+        return safe_repr(value)
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    return value
+
+
+def _normalize_value(value, is_databag):
+    # type: (Any, bool) -> Tuple[Any, bool, Optional[Dict[str, Any]]]
+    """Unwraps annotated values, converts leaves and strips databags.
+    Returns the value, whether it is a container that still needs to be
+    walked, and its metadata.
+    """
+    annotations = []
+    while isinstance(value, AnnotatedValue):
+        annotations.append(value.metadata)
+        value = value.value
+
+    remark = None
+    is_container = isinstance(value, Mapping) or (
+        isinstance(value, Sequence) and not isinstance(value, (text_type, bytes))
+    )
+
+    if not is_container:
+        value = _normalize_leaf(value)
+        if is_databag and isinstance(value, text_type):
+            stripped = strip_string(value)
+            if isinstance(stripped, AnnotatedValue):
+                value = stripped.value
+                remark = stripped.metadata
+    elif is_databag and len(value) > _MAX_BREADTH:
+        if isinstance(value, Mapping):
+            value = dict(list(value.items())[:_MAX_BREADTH])
+        else:
+            value = value[:_MAX_BREADTH]
+        remark = {"len": _MAX_BREADTH}
+
+    if is_databag:
+        for metadata in reversed(annotations):
+            remark = _merge_metadata(metadata, remark)
+    elif annotations:
+        remark = annotations[0]
+
+    return value, is_container, remark
+
+
+def normalize_event(event):
+    # type: (Dict[str, Any]) -> Dict[str, Any]
+    """Converts the event to JSON compatible types, strips frame variables,
+    request data and breadcrumbs and moves the metadata of annotated values
+    to `_meta`.
+
+    This is equivalent to calling `convert_types`, `strip_event_mut` and
+    `flatten_metadata` in a row but walks the event only once and without
+    recursion.
+    """
+    rv = {}  # type: Dict[Any, Any]
+    meta = {}  # type: Dict[str, Any]
+
+    # Items are `(value, zone, parent, key, parent_meta, meta_key)`.
+    # Containers are attached to their parent right away, then their
+    # children are pushed.  An item without a value removes the metadata of
+    # a container again if none of its children had any.
+    stack = []  # type: List[Tuple[Any, Any, Any, Any, Optional[Dict[str, Any]], str]]
+    _push_children(stack, event, "event", rv, meta)
+
+    while stack:
+        value, zone, parent, key, parent_meta, meta_key = stack.pop()
+
+        if parent is None:
+            if not parent_meta[meta_key]:  # type: ignore
+                del parent_meta[meta_key]  # type: ignore
+            continue
+
+        is_databag = isinstance(zone, int)
+        if is_databag and zone <= 0:
+            if isinstance(parent, list):
+                parent[key] = None
+            if parent_meta is not None:
+                parent_meta[meta_key] = {"": {"rem": [["!limit", "x"]]}}
+            continue
+
+        value, is_container, remark = _normalize_value(value, is_databag)
+
+        child_meta = None  # type: Optional[Dict[str, Any]]
+        if parent_meta is not None:
+            if remark is not None:
+                # The metadata of an annotated value replaces that of its
+                # children
+                parent_meta[meta_key] = {"": remark}
+            elif is_container:
+                child_meta = parent_meta[meta_key] = {}
+                stack.append((None, None, None, None, parent_meta, meta_key))
+
+        if not is_container:
+            if value is not None or isinstance(parent, list):
+                parent[key] = value
+            continue
+
+        container = {} if isinstance(value, Mapping) else [None] * len(value)
+        parent[key] = container
+        _push_children(stack, value, zone, container, child_meta)
+
+    if meta:
+        rv["_meta"] = meta
+    return rv
+
+
+def _push_children(
+    stack,  # type: List[Tuple[Any, Any, Any, Any, Optional[Dict[str, Any]], str]]
+    value,  # type: Any
+    zone,  # type: Any
+    container,  # type: Any
+    meta,  # type: Optional[Dict[str, Any]]
+):
+    # type: (...) -> None
+    if isinstance(container, list):
+        if isinstance(zone, int):
+            child_zone = zone - 1
+        else:
+            child_zone = _STRIP_ITEM_ZONES.get(zone)
+        for i in range(len(value) - 1, -1, -1):
+            stack.append((value[i], child_zone, container, i, meta, str(i)))
+        return
+
+    zones = None if isinstance(zone, int) else _STRIP_ZONES.get(zone)
+    for key, child in reversed(list(value.items())):
+        # "" keys cannot be told apart from metadata
+        if key == "":
+            continue
+        if zones is None:
+            child_zone = zone - 1 if isinstance(zone, int) else None
+        else:
+            child_zone = zones.get(key)
+        stack.append((child, child_zone, container, key, meta, key))
+
+
 def format_and_strip(template, params, strip_string=strip_string):
     """Format a string containing %s for placeholders and call `strip_string`
     on each parameter. The string template itself does not have a maximum
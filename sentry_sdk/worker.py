@@ -1,27 +1,262 @@
 import os
 
-from threading import Thread, Lock
+from collections import deque
+from threading import Thread, Lock, Condition
 from time import sleep, time
-from sentry_sdk._compat import queue, check_thread_support
+from sentry_sdk._compat import check_thread_support
 from sentry_sdk.utils import logger
 
 if False:
-    from queue import Queue
     from typing import Any
+    from typing import Deque
+    from typing import List
     from typing import Optional
     from typing import Callable
 
 
 _TERMINATOR = object()
 
+OVERFLOW_POLICIES = ("drop_newest", "drop_oldest", "drop_lowest_level")
 
-class BackgroundWorker(object):
-    def __init__(self):
+_LEVEL_RANKS = {"debug": 0, "info": 1, "warning": 2, "error": 3, "fatal": 4}
+
+
+class _Job(object):
+    __slots__ = ("item", "size", "rank", "shard", "seq")
+
+    def __init__(self, item, size=0, level=None, droppable=True):
+        # type: (Any, int, Optional[str], bool) -> None
+        self.item = item
+        self.size = size
+        # A rank of `None` marks jobs that must never be dropped (such as
+        # the terminator).  Events without a level count as errors.
+        self.rank = _LEVEL_RANKS.get(level or "error", 3) if droppable else None
+        self.shard = 0
+        self.seq = 0
+
+
+class _JobQueue(object):
+    """A FIFO of jobs that is bounded by item count and by the total
+    estimated size of the queued jobs.  Unlike `queue.Queue` putting a job
+    never blocks: if the queue is full a job is dropped according to the
+    overflow policy.
+
+    The queue is split into shards, one per consumer thread.  Jobs with the
+    same key always end up in the same shard so that they are processed in
+    order, while the limits apply to all shards together.
+    """
+
+    def __init__(
+        self,
+        max_items=None,  # type: Optional[int]
+        max_bytes=None,  # type: Optional[int]
+        policy="drop_newest",  # type: str
+        shards=1,  # type: int
+    ):
+        # type: (...) -> None
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(
+                "Invalid overflow policy %r. Must be one of %s"
+                % (policy, OVERFLOW_POLICIES)
+            )
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.dropped = 0
+        self.size = 0
+        self._shards = [deque() for _ in range(shards)]  # type: List[Deque[_Job]]
+        self._count = 0
+        self._seq = 0
+        self._unfinished = 0
+        self._mutex = Lock()
+        self._not_empty = [Condition(self._mutex) for _ in range(shards)]
+        self._all_done = Condition(self._mutex)
+
+    def __len__(self):
+        # type: () -> int
+        return self._count
+
+    @property
+    def in_flight(self):
+        # type: () -> int
+        """The number of jobs taken from the queue but not yet done."""
+        return self._unfinished - self._count
+
+    def _is_full(self, job):
+        # type: (_Job) -> bool
+        if self.max_items and self._count >= self.max_items:
+            return True
+        # A single oversized job is still accepted into an empty queue,
+        # otherwise it could never be sent at all.
+        if self.max_bytes and self._count and self.size + job.size > self.max_bytes:
+            return True
+        return False
+
+    def _pick_victim(self, job):
+        # type: (_Job) -> _Job
+        if self.policy == "drop_newest":
+            return job
+        candidates = [
+            queued
+            for shard in self._shards
+            for queued in shard
+            if queued.rank is not None
+        ]
+        if self.policy == "drop_lowest_level":
+            # On ties the incoming job loses, which keeps the queue FIFO.
+            candidates = [
+                queued
+                for queued in candidates
+                if queued.rank < job.rank  # type: ignore
+            ]
+            if not candidates:
+                return job
+            return min(candidates, key=lambda queued: (queued.rank, queued.seq))
+        if not candidates:
+            return job
+        return min(candidates, key=lambda queued: queued.seq)
+
+    def _shard_for_key(self, key):
+        # type: (Optional[Any]) -> int
+        if len(self._shards) == 1:
+            return 0
+        if key is not None:
+            try:
+                return hash(key) % len(self._shards)
+            except TypeError:
+                pass
+        return min(range(len(self._shards)), key=lambda i: len(self._shards[i]))
+
+    def put(self, job, key=None, shard=None):
+        # type: (_Job, Optional[Any], Optional[int]) -> bool
+        """Appends a job.  Returns `False` if the job itself was dropped.
+
+        Jobs are routed to a shard by `key`, jobs without a key go to the
+        shortest shard.
+        """
+        with self._mutex:
+            while job.rank is not None and self._is_full(job):
+                victim = self._pick_victim(job)
+                self.dropped += 1
+                if victim is job:
+                    return False
+                self._shards[victim.shard].remove(victim)
+                self._count -= 1
+                self.size -= victim.size
+                self._unfinished -= 1
+
+            if shard is None:
+                shard = self._shard_for_key(key)
+
+            job.shard = shard
+            job.seq = self._seq
+            self._seq += 1
+            self._shards[shard].append(job)
+            self._count += 1
+            self.size += job.size
+            self._unfinished += 1
+            self._not_empty[shard].notify()
+            return True
+
+    def get_batch(self, shard=0, max_items=1, timeout=0.0):
+        # type: (int, int, float) -> List[_Job]
+        """Blocks until a job is available in `shard` and returns it together
+        with up to `max_items - 1` further jobs that arrive within `timeout`
+        seconds.  Jobs that must not be dropped (the terminator) are always
+        returned on their own.
+        """
+        jobs = self._shards[shard]
+        not_empty = self._not_empty[shard]
+        rv = []  # type: List[_Job]
+        deadline = None  # type: Optional[float]
+        with self._mutex:
+            while True:
+                while not jobs:
+                    if deadline is None:
+                        not_empty.wait()
+                        continue
+                    delay = deadline - time()
+                    if delay <= 0:
+                        return rv
+                    not_empty.wait(timeout=delay)
+
+                if jobs[0].rank is None and rv:
+                    return rv
+                job = jobs.popleft()
+                self._count -= 1
+                self.size -= job.size
+                rv.append(job)
+                if job.rank is None or len(rv) >= max_items:
+                    return rv
+                if deadline is None:
+                    deadline = time() + timeout
+
+    def drain(self):
+        # type: () -> List[_Job]
+        """Removes and returns all jobs that are still waiting."""
+        rv = []  # type: List[_Job]
+        with self._mutex:
+            for jobs in self._shards:
+                for job in list(jobs):
+                    if job.rank is not None:
+                        jobs.remove(job)
+                        rv.append(job)
+            self._count -= len(rv)
+            self.size -= sum(job.size for job in rv)
+            self._unfinished -= len(rv)
+            if self._unfinished <= 0:
+                self._all_done.notify_all()
+        rv.sort(key=lambda job: job.seq)
+        return rv
+
+    def task_done(self):
         # type: () -> None
+        with self._mutex:
+            self._unfinished -= 1
+            if self._unfinished <= 0:
+                self._all_done.notify_all()
+
+    def join(self, timeout):
+        # type: (float) -> bool
+        deadline = time() + timeout
+        with self._mutex:
+            while self._unfinished > 0:
+                delay = deadline - time()
+                if delay <= 0:
+                    return False
+                self._all_done.wait(timeout=delay)
+            return True
+
+
+class BackgroundWorker(object):
+    def __init__(
+        self,
+        queue_size=None,  # type: Optional[int]
+        queue_bytes=None,  # type: Optional[int]
+        overflow_policy="drop_newest",  # type: str
+        batch_callback=None,  # type: Optional[Callable[[List[Any]], None]]
+        batch_size=1,  # type: int
+        batch_timeout=0.0,  # type: float
+        num_threads=1,  # type: int
+    ):
+        # type: (...) -> None
+        """Creates a worker that runs submitted callbacks on `num_threads`
+        background threads.
+
+        If `batch_callback` is given, submitted items are not called but
+        handed to it in lists of up to `batch_size` items, collected for at
+        most `batch_timeout` seconds after the first one arrived.
+        """
         check_thread_support()
-        self._queue = queue.Queue(-1)  # type: Queue[Any]
+        self._num_threads = max(num_threads, 1)
+        self._queue = _JobQueue(
+            queue_size, queue_bytes, overflow_policy, shards=self._num_threads
+        )
+        self._batch_callback = batch_callback
+        self._batch_size = max(batch_size, 1) if batch_callback is not None else 1
+        self._batch_timeout = batch_timeout
         self._lock = Lock()
-        self._thread = None  # type: Optional[Thread]
+        self._threads = []  # type: List[Thread]
         self._thread_for_pid = None  # type: Optional[int]
 
     @property
@@ -29,9 +264,27 @@ class BackgroundWorker(object):
         # type: () -> bool
         if self._thread_for_pid != os.getpid():
             return False
-        if not self._thread:
+        if not self._threads:
             return False
-        return self._thread.is_alive()
+        return all(thread.is_alive() for thread in self._threads)
+
+    @property
+    def dropped_events(self):
+        # type: () -> int
+        """The number of jobs dropped because the queue was full."""
+        return self._queue.dropped
+
+    @property
+    def queued_events(self):
+        # type: () -> int
+        """The number of jobs waiting in the queue."""
+        return len(self._queue)
+
+    @property
+    def in_flight_events(self):
+        # type: () -> int
+        """The number of jobs currently being processed."""
+        return self._queue.in_flight
 
     def _ensure_thread(self):
         # type: () -> None
@@ -40,73 +293,92 @@ class BackgroundWorker(object):
 
     def _timed_queue_join(self, timeout):
         # type: (float) -> bool
-        deadline = time() + timeout
-        queue = self._queue
-        queue.all_tasks_done.acquire()  # type: ignore
-        try:
-            while queue.unfinished_tasks:  # type: ignore
-                delay = deadline - time()
-                if delay <= 0:
-                    return False
-                queue.all_tasks_done.wait(timeout=delay)  # type: ignore
-            return True
-        finally:
-            queue.all_tasks_done.release()  # type: ignore
+        return self._queue.join(timeout)
 
     def start(self):
         # type: () -> None
         with self._lock:
-            if not self.is_alive:
-                self._thread = Thread(
-                    target=self._target, name="raven-sentry.BackgroundWorker"
-                )
-                self._thread.setDaemon(True)
-                self._thread.start()
-                self._thread_for_pid = os.getpid()
+            # Threads do not survive a fork, otherwise only the ones that
+            # died are replaced.
+            if self._thread_for_pid != os.getpid() or not self._threads:
+                threads = [None] * self._num_threads  # type: List[Optional[Thread]]
+            else:
+                threads = list(self._threads)
+            for shard, thread in enumerate(threads):
+                if thread is None or not thread.is_alive():
+                    thread = Thread(
+                        target=self._target,
+                        args=(shard,),
+                        name="raven-sentry.BackgroundWorker",
+                    )
+                    thread.setDaemon(True)
+                    thread.start()
+                    threads[shard] = thread
+            self._threads = threads  # type: ignore
+            self._thread_for_pid = os.getpid()
 
     def kill(self):
         # type: () -> None
         logger.debug("background worker got kill request")
         with self._lock:
-            if self._thread:
-                self._queue.put_nowait(_TERMINATOR)
-                self._thread = None
+            if self._threads:
+                for shard in range(len(self._threads)):
+                    self._queue.put(_Job(_TERMINATOR, droppable=False), shard=shard)
+                self._threads = []
                 self._thread_for_pid = None
 
     def flush(self, timeout, callback=None):
         # type: (float, Optional[Any]) -> None
         logger.debug("background worker got flush request")
-        with self._lock:
-            if self.is_alive and timeout > 0.0:
-                self._wait_flush(timeout, callback)
+        # Do not hold the lock while waiting, `submit` must never block.
+        if self.is_alive and timeout > 0.0:
+            self._wait_flush(timeout, callback)
         logger.debug("background worker flushed")
 
     def _wait_flush(self, timeout, callback):
         # type: (float, Optional[Any]) -> None
         initial_timeout = min(0.1, timeout)
         if not self._timed_queue_join(initial_timeout):
-            pending = self._queue.qsize()
+            pending = len(self._queue)
             logger.debug("%d event(s) pending on flush", pending)
             if callback is not None:
                 callback(pending, timeout)
             self._timed_queue_join(timeout - initial_timeout)
 
-    def submit(self, callback):
-        # type: (Callable) -> None
+    def drain(self):
+        # type: () -> List[Any]
+        """Removes all items that are still queued and returns them."""
+        return [job.item for job in self._queue.drain()]
+
+    def submit(self, item, size=0, level=None, key=None):
+        # type: (Any, int, Optional[str], Optional[Any]) -> bool
+        """Queues a callback (or an item for the batch callback) for the
+        worker threads.  `size` is the estimated payload size and `level` the
+        event level, both are used to decide what to drop when the queue is
+        full.  Items with the same `key` are processed in order by the same
+        thread.  Returns `False` if the item was dropped.
+        """
         self._ensure_thread()
-        self._queue.put_nowait(callback)
+        if not self._queue.put(_Job(item, size, level), key=key):
+            logger.debug("background worker queue full, dropped event")
+            return False
+        return True
 
-    def _target(self):
-        # type: () -> None
+    def _target(self, shard):
+        # type: (int) -> None
         while True:
-            callback = self._queue.get()
+            jobs = self._queue.get_batch(shard, self._batch_size, self._batch_timeout)
             try:
-                if callback is _TERMINATOR:
+                if jobs[0].item is _TERMINATOR:
                     break
                 try:
-                    callback()
+                    if self._batch_callback is not None:
+                        self._batch_callback([job.item for job in jobs])
+                    else:
+                        jobs[0].item()
                 except Exception:
                     logger.error("Failed processing job", exc_info=True)
             finally:
-                self._queue.task_done()
+                for _ in jobs:
+                    self._queue.task_done()
             sleep(0)
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import threading
+import time
+
+from email.utils import formatdate
+
+import pytest
+from aiohttp import web
+
+from sentry_sdk import Hub, Client, capture_message, capture_exception
+from sentry_sdk.async_transport import AsyncHttpTransport, _parse_retry_after
+
+
+async def _make_server(aiohttp_server, status=200, headers=None):
+    received = []
+
+    async def store(request):
+        # aiohttp already took care of the gzip content encoding
+        received.append(json.loads((await request.read()).decode("utf-8")))
+        return web.Response(text="ok", status=status, headers=headers)
+
+    app = web.Application()
+    app.router.add_post("/api/123/store/", store)
+    server = await aiohttp_server(app)
+    return server, received
+
+
+async def _close(client):
+    client.close()
+    # Give the loop a chance to close the HTTP session
+    await asyncio.sleep(0.01)
+
+
+async def test_sends_from_event_loop(aiohttp_server, loop):
+    server, received = await _make_server(aiohttp_server)
+    client = Client(
+        "http://foobar@{}:{}/123".format(server.host, server.port),
+        transport=AsyncHttpTransport,
+    )
+    transport = client.transport
+
+    with Hub(client):
+        capture_message("hi")
+
+    await transport.flush_async(2.0)
+    await _close(client)
+
+    event, = received
+    assert event["message"] == "hi"
+    # No background thread was needed
+    assert not transport._worker.is_alive
+
+
+async def test_defer_serialization(aiohttp_server, loop):
+    server, received = await _make_server(aiohttp_server)
+    threads = []
+
+    def before_send(event, hint):
+        threads.append(threading.current_thread())
+        return event
+
+    client = Client(
+        "http://foobar@{}:{}/123".format(server.host, server.port),
+        transport=AsyncHttpTransport,
+        defer_serialization=True,
+        before_send=before_send,
+    )
+    transport = client.transport
+
+    with Hub(client):
+        try:
+            value = 42  # noqa
+            1 / 0
+        except Exception:
+            capture_exception()
+
+    await transport.flush_async(2.0)
+    # The event was prepared off the event loop, but not by the worker
+    assert threads and threading.current_thread() not in threads
+    assert not transport._worker.is_alive
+    await _close(client)
+
+    event, = received
+    frame = event["exception"]["values"][0]["stacktrace"]["frames"][-1]
+    assert frame["vars"]["value"] == "42"
+    assert frame["context_line"].strip() == "1 / 0"
+
+
+async def test_capture_from_other_thread(aiohttp_server, loop):
+    server, received = await _make_server(aiohttp_server)
+    client = Client(
+        "http://foobar@{}:{}/123".format(server.host, server.port),
+        transport=AsyncHttpTransport,
+    )
+    transport = client.transport
+
+    with Hub(client):
+        capture_message("from loop")
+
+    def in_thread():
+        with Hub(client):
+            capture_message("from thread")
+
+    thread = threading.Thread(target=in_thread)
+    thread.start()
+    thread.join()
+
+    # Let the loop pick up the event handed over from the other thread
+    await loop.run_in_executor(None, lambda: None)
+    await transport.flush_async(2.0)
+    await _close(client)
+
+    assert sorted(event["message"] for event in received) == [
+        "from loop",
+        "from thread",
+    ]
+    assert not transport._worker.is_alive
+
+
+async def test_rate_limited(aiohttp_server, loop):
+    server, received = await _make_server(
+        aiohttp_server, status=429, headers={"Retry-After": "60"}
+    )
+    client = Client(
+        "http://foobar@{}:{}/123".format(server.host, server.port),
+        transport=AsyncHttpTransport,
+    )
+    transport = client.transport
+
+    with Hub(client):
+        capture_message("first")
+        await transport.flush_async(2.0)
+        capture_message("second")
+        await transport.flush_async(2.0)
+    await _close(client)
+
+    assert [event["message"] for event in received] == ["first"]
+    assert transport._disabled_until is not None
+    # The urllib3 pool was never needed
+    assert transport._pool_and_retry is None
+
+
+def test_parse_retry_after():
+    assert _parse_retry_after(None) is None
+    assert _parse_retry_after(" 30 ") == 30
+    assert _parse_retry_after("soon") is None
+    assert _parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+
+    later = formatdate(time.time() + 120, usegmt=True)
+    assert 100 < _parse_retry_after(later) <= 120
+
+
+def test_spool_dir_not_supported(tmpdir):
+    with pytest.raises(ValueError):
+        Client(
+            "http://foobar@localhost/123",
+            transport=AsyncHttpTransport,
+            spool_dir=str(tmpdir),
+        )
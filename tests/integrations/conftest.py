@@ -6,16 +6,16 @@ import sentry_sdk
 def capture_exceptions(monkeypatch):
     def inner():
         errors = set()
-        old_capture_event = sentry_sdk.Hub.capture_event
+        old_capture_event = sentry_sdk.Client._capture_event
 
-        def capture_event(self, event, hint=None):
+        def capture_event(self, event, hint, scope, pending=None):
             if hint:
                 if "exc_info" in hint:
                     error = hint["exc_info"][1]
                     errors.add(error)
-            return old_capture_event(self, event, hint=hint)
+            return old_capture_event(self, event, hint, scope, pending)
 
-        monkeypatch.setattr(sentry_sdk.Hub, "capture_event", capture_event)
+        monkeypatch.setattr(sentry_sdk.Client, "_capture_event", capture_event)
         return errors
 
     return inner
@@ -1,5 +1,7 @@
+import gc
 import pytest
 import json
+import weakref
 
 from werkzeug.test import Client
 from django.contrib.auth.models import User
@@ -13,7 +15,7 @@ except ImportError:
     from django.core.urlresolvers import reverse
 
 from sentry_sdk import capture_message, capture_exception
-from sentry_sdk.integrations.django import DjangoIntegration
+from sentry_sdk.integrations.django import DjangoIntegration, record_sql
 
 from tests.integrations.django.myapp.wsgi import application
 
@@ -302,6 +304,110 @@ def test_sql_queries_large_params(sentry_init, capture_events):
     )
 
 
+@pytest.mark.django_db
+def test_sql_queries_formatted_lazily(sentry_init, capture_events, monkeypatch):
+    sentry_init(integrations=[DjangoIntegration()], send_default_pii=True)
+    from django.db import connection
+    import sentry_sdk.integrations.django as django_integration
+
+    formatted = []
+    format_sql = django_integration.format_sql
+
+    def counting_format_sql(sql, params):
+        formatted.append(sql)
+        return format_sql(sql, params)
+
+    monkeypatch.setattr(django_integration, "format_sql", counting_format_sql)
+
+    sql = connection.cursor()
+
+    events = capture_events()
+    params = [123]
+    with pytest.raises(OperationalError):
+        # table doesn't even exist
+        sql.execute("""SELECT count(*) FROM people_person WHERE foo = %s""", params)
+    params.append(456)
+
+    assert not formatted
+
+    capture_message("HI")
+
+    event, = events
+
+    crumb, = event["breadcrumbs"]
+    assert crumb["message"] == """SELECT count(*) FROM people_person WHERE foo = 123"""
+    assert len(formatted) == 1
+
+
+def test_sql_breadcrumb_keeps_no_references(sentry_init, capture_events):
+    sentry_init(integrations=[DjangoIntegration()], send_default_pii=True)
+
+    class Param(object):
+        def __repr__(self):
+            return "<Param>"
+
+    class Composed(object):
+        pass
+
+    class Connection(object):
+        encoding = "utf-8"
+
+    class Cursor(object):
+        connection = Connection()
+        closed = False
+
+        def mogrify(self, sql, params):
+            assert not self.closed
+            return b"SELECT 'composed'"
+
+    param = Param()
+    cursor = Cursor()
+    refs = [weakref.ref(param), weakref.ref(cursor)]
+
+    events = capture_events()
+    record_sql("SELECT %s, %s", [param, "x" * 10 ** 6], cursor)
+    record_sql(Composed(), {}, cursor)
+
+    cursor.closed = True
+    del param, cursor
+    gc.collect()
+    assert [ref() for ref in refs] == [None, None]
+
+    capture_message("HI")
+
+    event, = events
+    crumb, composed_crumb = event["breadcrumbs"][-2:]
+    assert crumb["message"].startswith("SELECT <Param>, 'xxx")
+    assert len(crumb["message"]) < 1000
+    assert composed_crumb["message"] == "SELECT 'composed'"
+
+
+@pytest.mark.django_db
+def test_sql_executemany(sentry_init, capture_events):
+    sentry_init(integrations=[DjangoIntegration()], send_default_pii=True)
+    from django.db import connection
+
+    sql = connection.cursor()
+
+    events = capture_events()
+    with pytest.raises(OperationalError):
+        # table doesn't even exist
+        sql.executemany(
+            """INSERT INTO people_person (foo) VALUES (%s)""",
+            [[i] for i in range(1000)],
+        )
+
+    capture_message("HI")
+
+    event, = events
+
+    crumb, = event["breadcrumbs"]
+    assert crumb["message"] == """INSERT INTO people_person (foo) VALUES (0)"""
+    assert crumb["data"]["rowcount"] == 1000
+    assert crumb["data"]["params"] == [[str(i)] for i in range(10)]
+    assert crumb["data"]["duration"] >= 0
+
+
 @pytest.mark.parametrize(
     "transaction_style,expected_transaction",
     [
@@ -1,8 +1,13 @@
+import gc
 import sys
+import threading
+import time
+import weakref
 
 import pytest
 import logging
 
+from sentry_sdk import Hub, configure_scope
 from sentry_sdk.integrations.logging import LoggingIntegration
 
 other_logger = logging.getLogger("testfoo")
@@ -73,3 +78,173 @@ def test_logging_stack(sentry_init, capture_events):
 
     assert event_without["level"] == "error"
     assert "threads" not in event_without
+
+
+def test_logging_level_gate(sentry_init, capture_events, monkeypatch):
+    sentry_init(integrations=[LoggingIntegration()], default_integrations=False)
+    events = capture_events()
+
+    lookups = []
+    get_integration = Hub.get_integration
+
+    def counting_get_integration(self, integration):
+        lookups.append(integration)
+        return get_integration(self, integration)
+
+    monkeypatch.setattr(Hub, "get_integration", counting_get_integration)
+
+    logger.debug("debug")
+    assert not lookups
+
+    logger.info("bread")
+    logger.critical("lol")
+    assert lookups
+
+    event, = events
+    assert event["breadcrumbs"][-1]["message"] == "bread"
+    assert not any(crumb["message"] == "debug" for crumb in event["breadcrumbs"])
+
+
+def test_logging_queued(sentry_init, capture_events):
+    release = threading.Event()
+    threads = []
+
+    def before_send(event, hint):
+        threads.append(threading.current_thread())
+        release.wait()
+        return event
+
+    integration = LoggingIntegration(queue_size=1)
+    sentry_init(
+        integrations=[integration], default_integrations=False, before_send=before_send
+    )
+    events = capture_events()
+
+    with configure_scope() as scope:
+        scope.set_tag("foo", "bar")
+
+    logger.error("first", exc_info=True)
+    while not threads:
+        time.sleep(0.01)
+
+    # The worker is busy with the first record, the queue holds one more
+    logger.error("second")
+    logger.error("third")
+    assert integration._handler._worker.dropped_events == 1
+
+    release.set()
+    Hub.current.client.flush()
+
+    assert threading.current_thread() not in threads
+    first, second = events
+    assert first["logentry"]["message"] == "first"
+    assert first["tags"] == {"foo": "bar"}
+    frame, = (
+        frame
+        for frame in first["threads"]["values"][0]["stacktrace"]["frames"]
+        if frame["function"] == "test_logging_queued"
+    )
+    assert frame["context_line"].strip() == 'logger.error("first", exc_info=True)'
+    assert second["logentry"]["message"] == "second"
+
+
+def test_logging_queued_snapshots_locals(sentry_init, capture_events):
+    release = threading.Event()
+
+    def before_send(event, hint):
+        release.wait()
+        return event
+
+    sentry_init(
+        integrations=[LoggingIntegration(queue_size=3)],
+        default_integrations=False,
+        before_send=before_send,
+    )
+    events = capture_events()
+
+    # Keeps the worker busy until the locals below changed
+    logger.error("blocker")
+
+    value = "at logging call"
+    logger.error("stack", exc_info=True)
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        logger.exception("exception")
+    value = "changed later"  # noqa
+
+    release.set()
+    Hub.current.client.flush()
+
+    _, stack_event, exception_event = events
+    stack_frames = stack_event["threads"]["values"][0]["stacktrace"]["frames"]
+    exception_frames = exception_event["exception"]["values"][0]["stacktrace"]["frames"]
+    for frames in stack_frames, exception_frames:
+        frame, = (
+            frame
+            for frame in frames
+            if frame["function"] == "test_logging_queued_snapshots_locals"
+        )
+        assert frame["vars"]["value"] == "'at logging call'"
+    assert exception_event["exception"]["values"][0]["mechanism"]["type"] == "logging"
+
+
+def _crumbs(event, message):
+    return [crumb for crumb in event["breadcrumbs"] if crumb["message"] == message]
+
+
+def test_logging_breadcrumb_frees_traceback(sentry_init, capture_events):
+    sentry_init(integrations=[LoggingIntegration()], default_integrations=False)
+    events = capture_events()
+
+    # Keep the records away from pytest's log capturing
+    isolated_logger = logging.getLogger("test_logging_isolated")
+    isolated_logger.setLevel(logging.DEBUG)
+    isolated_logger.propagate = False
+
+    class Local(object):
+        pass
+
+    def log_exception():
+        local = Local()
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            isolated_logger.warning("freed", exc_info=True, extra=dict(foo=42))
+        return weakref.ref(local)
+
+    ref = log_exception()
+    gc.collect()
+    assert ref() is None
+
+    isolated_logger.error("event")
+    event, = events
+    crumb, = _crumbs(event, "freed")
+    assert crumb["data"] == {"foo": 42}
+
+
+def test_logging_breadcrumb_extra_at_log_time(sentry_init, capture_events):
+    sentry_init(integrations=[LoggingIntegration()], default_integrations=False)
+    events = capture_events()
+
+    records = []
+
+    class Keep(logging.Handler):
+        def emit(self, record):
+            records.append(record)
+
+    handler = Keep()
+    logger.addHandler(handler)
+    try:
+        logger.info("mutated", extra=dict(foo=42))
+    finally:
+        logger.removeHandler(handler)
+
+    record, = records
+    record.foo = 43
+    record.bar = 69
+
+    logger.error("event")
+    event, = events
+    crumb, = _crumbs(event, "mutated")
+    assert crumb["data"] == {"foo": 42}
@@ -12,3 +12,38 @@ def test_basic(sentry_init, capture_events):
     event, = events
     assert "sentry-sdk" in event["modules"]
     assert "pytest" in event["modules"]
+
+
+def test_modules_sent_once(sentry_init, capture_events):
+    sentry_init(integrations=[ModulesIntegration()])
+    events = capture_events()
+
+    sentry_sdk.capture_message("first")
+    sentry_sdk.capture_message("second")
+
+    first, second = events
+    assert "sentry-sdk" in first["modules"]
+    assert "modules" not in second
+    assert first["contexts"]["modules"] == second["contexts"]["modules"]
+    assert len(second["contexts"]["modules"]["hash"]) == 40
+
+
+def test_modules_resent_after_dropped_event(sentry_init, capture_events):
+    dropped = []
+
+    def before_send(event, hint):
+        if not dropped:
+            dropped.append(event)
+            return None
+        return event
+
+    sentry_init(integrations=[ModulesIntegration()], before_send=before_send)
+    events = capture_events()
+
+    sentry_sdk.capture_message("dropped")
+    sentry_sdk.capture_message("first")
+    sentry_sdk.capture_message("second")
+
+    first, second = events
+    assert "sentry-sdk" in first["modules"]
+    assert "modules" not in second
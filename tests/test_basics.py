@@ -2,8 +2,11 @@ import logging
 
 import pytest
 
+import sentry_sdk.hub
+
 from sentry_sdk import (
     Client,
+    init,
     push_scope,
     configure_scope,
     capture_exception,
@@ -13,6 +16,7 @@ from sentry_sdk import (
     Hub,
 )
 from sentry_sdk.integrations.logging import LoggingIntegration
+from sentry_sdk.scope import Breadcrumb
 
 
 def test_processors(sentry_init, capture_events):
@@ -205,6 +209,39 @@ def test_breadcrumbs(sentry_init, capture_events):
     assert len(event["breadcrumbs"]) == 0
 
 
+def test_breadcrumbs_are_built_lazily(sentry_init, capture_events):
+    sentry_init(max_breadcrumbs=3)
+    events = capture_events()
+
+    for i in range(5):
+        add_breadcrumb(message="crumb %s" % i)
+    add_breadcrumb({"message": "explicit", "timestamp": 1234.5}, type="http", foo=1)
+
+    with configure_scope() as scope:
+        assert scope._breadcrumbs.maxlen == 3
+        assert all(isinstance(crumb, Breadcrumb) for crumb in scope._breadcrumbs)
+        # The fields live in slots, no dictionary is kept per breadcrumb
+        crumb = scope._breadcrumbs[0]
+        assert not hasattr(crumb, "__dict__")
+        assert crumb.message == "crumb 3"
+        assert crumb.other is None
+        assert scope._breadcrumbs[-1].other == {"foo": 1}
+
+    capture_message("hi")
+    event, = events
+
+    assert [crumb["message"] for crumb in event["breadcrumbs"]] == [
+        "crumb 3",
+        "crumb 4",
+        "explicit",
+    ]
+    assert event["breadcrumbs"][0]["type"] == "default"
+    assert event["breadcrumbs"][0]["timestamp"].endswith("Z")
+    assert event["breadcrumbs"][-1]["timestamp"] == 1234.5
+    assert event["breadcrumbs"][-1]["type"] == "http"
+    assert event["breadcrumbs"][-1]["foo"] == 1
+
+
 def test_integration_scoping():
     logger = logging.getLogger("test_basics")
     events = []
@@ -227,6 +264,49 @@ def test_integration_scoping():
     assert len(events) == 1
 
 
+def test_get_integration():
+    logging_integration = LoggingIntegration()
+    client = Client(default_integrations=False, integrations=[logging_integration])
+
+    for _ in range(2):
+        assert client.get_integration(LoggingIntegration) is logging_integration
+        assert client.get_integration("logging") is logging_integration
+        assert client.get_integration("stdlib") is None
+
+    with Hub(client) as hub:
+        assert hub.get_integration(LoggingIntegration) is logging_integration
+
+    with Hub(None) as hub:
+        assert hub.get_integration(LoggingIntegration) is None
+
+    class Nameless(LoggingIntegration):
+        identifier = None
+
+    with pytest.raises(ValueError):
+        client.get_integration(Nameless)
+
+
+def test_get_integration_initial_client(monkeypatch):
+    monkeypatch.setattr(sentry_sdk.hub, "_initial_client", None)
+    logging_integration = LoggingIntegration()
+
+    with Hub(Hub.current):
+        init(default_integrations=False, integrations=[logging_integration])
+        initial_ref = sentry_sdk.hub._initial_client
+
+        def fail():
+            raise AssertionError("initial client looked up")
+
+        # Misses on the initial client itself do not look at it again
+        monkeypatch.setattr(sentry_sdk.hub, "_initial_client", fail)
+        assert Hub.current.get_integration("stdlib") is None
+
+        monkeypatch.setattr(sentry_sdk.hub, "_initial_client", initial_ref)
+        with Hub(Client(default_integrations=False)) as hub:
+            with pytest.warns(Warning):
+                assert hub.get_integration(LoggingIntegration) is None
+
+
 def test_client_initialized_within_scope(sentry_init, caplog):
     caplog.set_level(logging.WARNING)
 
@@ -19,7 +19,7 @@ from sentry_sdk import (
 from sentry_sdk.hub import HubMeta
 from sentry_sdk.transport import Transport
 from sentry_sdk._compat import reraise, text_type, PY2
-from sentry_sdk.utils import HAS_CHAINED_EXCEPTIONS
+from sentry_sdk.utils import HAS_CHAINED_EXCEPTIONS, SerializationBudget, object_to_json
 
 if PY2:
     # Importing ABCs from collections is deprecated, and will stop working in 3.8
@@ -183,6 +183,25 @@ def test_ignore_errors():
     pytest.raises(EventCaptured, lambda: e(ValueError()))
 
 
+@pytest.mark.parametrize(
+    "options", [{"sample_rate": 0.0}, {"ignore_errors": [ZeroDivisionError]}]
+)
+def test_dropped_exceptions_are_not_serialized(monkeypatch, options):
+    def event_from_exception(*args, **kwargs):
+        raise AssertionError("event should not have been built")
+
+    monkeypatch.setattr("sentry_sdk.client.event_from_exception", event_from_exception)
+
+    events = []
+    hub = Hub(Client(transport=events.append, **options))
+    try:
+        1 / 0
+    except Exception:
+        assert hub.capture_exception() is None
+
+    assert not events
+
+
 def test_with_locals_enabled():
     events = []
     hub = Hub(Client(with_locals=True, transport=events.append))
@@ -508,6 +527,158 @@ def test_databag_breadth_stripping(sentry_init, capture_events):
     assert len(json.dumps(event)) < 10000
 
 
+def test_locals_budget(sentry_init, capture_events):
+    sentry_init(max_locals_objects=10)
+    events = capture_events()
+
+    def inner():
+        b = list(range(100))  # noqa
+        1 / 0
+
+    try:
+        a = 42  # noqa
+        inner()
+    except Exception:
+        capture_exception()
+
+    event, = events
+    outer, inner = event["exception"]["values"][0]["stacktrace"]["frames"]
+    frames_meta = event["_meta"]["exception"]["values"]["0"]["stacktrace"]["frames"]
+
+    assert outer["vars"]["a"] == "42"
+    assert "0" not in frames_meta
+
+    # The budget ran out while serializing `b`
+    b = inner["vars"]["b"]
+    assert b[-1] == "<truncated %d items>" % (100 - len(b) + 1)
+    assert frames_meta["1"]["vars"][""] == {"rem": [["!limit", "x"]]}
+
+
+def test_locals_budget_stops_iterating():
+    big = list(range(10 ** 6))
+    budget = SerializationBudget(max_objects=10)
+    start = time.time()
+    rv = object_to_json([big], budget=budget)
+    assert time.time() - start < 0.5
+
+    values, = rv
+    assert len(values) < 15
+    assert values[-1] == "<truncated %d items>" % (10 ** 6 - len(values) + 1)
+
+    rv = object_to_json({"a": 1, "b": 2, "c": 3}, budget=SerializationBudget(1))
+    assert rv["<truncated>"] + len(rv) - 1 == 3
+
+
+def test_frame_window(sentry_init, capture_events):
+    sentry_init(stacktrace_head_frames=2, stacktrace_tail_frames=3)
+    events = capture_events()
+
+    def recurse(n):
+        if n:
+            return recurse(n - 1)
+        1 / 0
+
+    try:
+        recurse(100)
+    except Exception:
+        capture_exception()
+
+    event, = events
+    stacktrace = event["exception"]["values"][0]["stacktrace"]
+    assert len(stacktrace["frames"]) == 5
+    # The test function and 101 calls to `recurse`
+    assert stacktrace["frames_omitted"] == [2, 99]
+    assert stacktrace["frames"][-1]["context_line"].strip() == "1 / 0"
+
+
+def test_defer_serialization():
+    class DeferringTransport(Transport):
+        def __init__(self):
+            Transport.__init__(self)
+            self.deferred = []
+            self.events = []
+
+        def capture_event(self, event):
+            self.events.append(event)
+
+        def capture_deferred_event(self, event, prepare):
+            self.deferred.append(prepare)
+
+    transport = DeferringTransport()
+    before_send_calls = []
+
+    def before_send(event, hint):
+        before_send_calls.append(hint["exc_info"][0])
+        return event
+
+    hub = Hub(
+        Client(transport=transport, defer_serialization=True, before_send=before_send)
+    )
+
+    try:
+        number = 42
+        items = ["old"]
+        1 / 0
+    except Exception:
+        hub.capture_exception()
+
+    number = 23  # noqa
+    items.append("new")
+
+    # Nothing is serialized until the transport asks for it
+    prepare, = transport.deferred
+    assert not before_send_calls
+
+    event = prepare()
+    assert before_send_calls == [ZeroDivisionError]
+
+    frame, = event["exception"]["values"][0]["stacktrace"]["frames"]
+    assert frame["context_line"].strip() == "1 / 0"
+    assert frame["vars"]["number"] == "42"
+    assert frame["vars"]["items"] == "<list>"
+    assert frame["in_app"] is True
+
+
+def test_defer_serialization_copies_scope_data():
+    class DeferringTransport(Transport):
+        def __init__(self):
+            Transport.__init__(self)
+            self.deferred = []
+
+        def capture_deferred_event(self, event, prepare):
+            self.deferred.append(prepare)
+
+    transport = DeferringTransport()
+    hub = Hub(Client(transport=transport, defer_serialization=True))
+
+    user = {"id": "1"}
+    runtime = {"name": "CPython"}
+    fingerprint = ["a"]
+    with hub.configure_scope() as scope:
+        scope.user = user
+        scope.set_context("runtime", runtime)
+        scope.set_tag("tag", "old")
+        scope.fingerprint = fingerprint
+
+    hub.capture_message("hi")
+
+    # The application keeps using the scope while the event waits
+    user["id"] = "2"
+    runtime["name"] = "PyPy"
+    fingerprint.append("b")
+    with hub.configure_scope() as scope:
+        scope.set_tag("tag", "new")
+        scope.set_context("other", {})
+
+    prepare, = transport.deferred
+    event = prepare()
+    assert event["user"] == {"id": "1"}
+    assert event["contexts"]["runtime"] == {"name": "CPython"}
+    assert "other" not in event["contexts"]
+    assert event["tags"] == {"tag": "old"}
+    assert event["fingerprint"] == ["a"]
+
+
 @pytest.mark.skipif(not HAS_CHAINED_EXCEPTIONS, reason="Only works on 3.3+")
 def test_chained_exceptions(sentry_init, capture_events):
     sentry_init()
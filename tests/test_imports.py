@@ -0,0 +1,75 @@
+import subprocess
+import sys
+
+import pytest
+
+from sentry_sdk._compat import PY2
+from sentry_sdk import integrations
+from sentry_sdk.integrations import when_imported
+
+
+def run_python(code, *flags):
+    return subprocess.run(
+        [sys.executable] + list(flags) + ["-c", code],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+
+
+@pytest.mark.skipif(sys.version_info < (3, 5), reason="subprocess.run")
+def test_import_does_not_load_transport_dependencies():
+    output = run_python(
+        "import sys\n"
+        "before = set(sys.modules)\n"
+        "import sentry_sdk\n"
+        "print(' '.join(sorted(set(sys.modules) - before)))\n"
+    ).stdout.split()
+
+    assert "sentry_sdk" in output
+    for module in "urllib3", "certifi", "http.client", "ssl", "email":
+        assert module not in output
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="-X importtime")
+def test_import_time_breakdown():
+    stderr = run_python("import sentry_sdk", "-X", "importtime").stderr
+
+    timings = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            timings[name.strip()] = int(cumulative)
+        except ValueError:
+            pass
+
+    assert "sentry_sdk" in timings
+    assert "sentry_sdk.transport" in timings
+    assert "urllib3" not in timings
+
+
+@pytest.mark.skipif(PY2, reason="modules are imported right away on Python 2")
+def test_when_imported(tmpdir, monkeypatch):
+    tmpdir.join("sentry_sdk_lazy_target.py").write("value = 42\n")
+    monkeypatch.syspath_prepend(str(tmpdir))
+    monkeypatch.delitem(sys.modules, "sentry_sdk_lazy_target", raising=False)
+    monkeypatch.setattr(sys, "meta_path", list(sys.meta_path))
+    monkeypatch.setattr(integrations, "_import_hooks", {})
+
+    seen = []
+    when_imported("sentry_sdk_lazy_target", lambda module: seen.append(module.value))
+    assert seen == []
+
+    import sentry_sdk_lazy_target
+
+    try:
+        assert seen == [42]
+        assert sentry_sdk_lazy_target.value == 42
+
+        when_imported("sentry_sdk_lazy_target", lambda module: seen.append("again"))
+        assert seen == [42, "again"]
+    finally:
+        del sys.modules["sentry_sdk_lazy_target"]
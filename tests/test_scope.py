@@ -1,4 +1,5 @@
 import copy
+import threading
 from sentry_sdk.scope import Scope
 
 
@@ -15,3 +16,78 @@ def test_copying():
     assert "bam" not in s2._tags
 
     assert s1._fingerprint is s2._fingerprint
+
+
+def test_copy_on_write():
+    s1 = Scope()
+    s1.set_tag("foo", "bar")
+    s1.set_extra("foo", "bar")
+    s1._add_breadcrumb({"message": "first"}, 2)
+
+    s2 = copy.copy(s1)
+    assert s2._tags is s1._tags
+    assert s2._breadcrumbs is s1._breadcrumbs
+
+    s2.set_tag("bam", "baz")
+    s2.add_event_processor(lambda event, hint: event)
+    s2._add_breadcrumb({"message": "second"}, 2)
+    s2._add_breadcrumb({"message": "third"}, 2)
+
+    assert s1._tags == {"foo": "bar"}
+    assert s2._tags == {"foo": "bar", "bam": "baz"}
+    assert s2._extras is s1._extras
+    assert not s1._event_processors
+    assert [crumb["message"] for crumb in s1._breadcrumbs] == ["first"]
+    assert [crumb["message"] for crumb in s2._breadcrumbs] == ["second", "third"]
+
+    s1.clear()
+    assert s2._tags == {"foo": "bar", "bam": "baz"}
+    assert len(s2._breadcrumbs) == 2
+
+
+def test_copy_leaves_source_unchanged():
+    s1 = Scope()
+    s1.set_tag("foo", "bar")
+    ownership = s1._ownership
+
+    s2 = copy.copy(s1)
+    assert s1._ownership is ownership
+    assert s2._tags is s1._tags
+
+    s1.set_tag("bam", "baz")
+    assert s2._tags == {"foo": "bar"}
+
+
+def test_concurrent_fork_and_mutate():
+    parent = Scope()
+    parent.set_tag("base", True)
+    children = []
+    start = threading.Event()
+
+    def fork(n):
+        start.wait()
+        for i in range(200):
+            child = copy.copy(parent)
+            child.set_tag("child", (n, i))
+            children.append(child)
+
+    threads = [threading.Thread(target=fork, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    start.set()
+    for i in range(200):
+        parent.set_tag("parent_%d" % i, i)
+        parent._add_breadcrumb({"message": str(i)}, 100)
+    for thread in threads:
+        thread.join()
+
+    assert len(children) == 800
+    for child in children:
+        assert child._tags["base"] is True
+        assert "child" in child._tags
+
+    assert "child" not in parent._tags
+    assert [k for k in parent._tags if k.startswith("parent_")] == [
+        "parent_%d" % i for i in range(200)
+    ]
+    assert len(parent._breadcrumbs) == 100
@@ -0,0 +1,407 @@
+import gzip
+import io
+import json
+import threading
+import time
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from sentry_sdk import Hub, Client, capture_message
+from sentry_sdk.spool import Spool
+from sentry_sdk.transport import HttpTransport, _estimate_event_size, _issue_key
+from sentry_sdk.worker import BackgroundWorker, _Job, _TERMINATOR
+
+
+def _blocked_worker(**kwargs):
+    worker = BackgroundWorker(**kwargs)
+    release = threading.Event()
+    worker.submit(release.wait, level="fatal")
+    # Wait for the worker thread to pick up the blocking job
+    while len(worker._queue):
+        time.sleep(0.01)
+    return worker, release
+
+
+@pytest.mark.parametrize(
+    "policy,expected",
+    [
+        ("drop_newest", ["info", "error"]),
+        ("drop_oldest", ["error", "warning"]),
+        ("drop_lowest_level", ["error", "warning"]),
+    ],
+)
+def test_worker_overflow_policies(policy, expected):
+    worker, release = _blocked_worker(queue_size=2, overflow_policy=policy)
+    sent = []
+
+    for level in "info", "error", "warning":
+        worker.submit(lambda level=level: sent.append(level), level=level)
+
+    release.set()
+    worker.flush(1.0)
+
+    assert sent == expected
+    assert worker.dropped_events == 1
+
+
+def test_worker_byte_budget():
+    worker, release = _blocked_worker(queue_bytes=100)
+
+    assert worker.submit(lambda: None, size=60)
+    assert not worker.submit(lambda: None, size=60)
+    assert worker.submit(lambda: None, size=40)
+
+    release.set()
+    worker.flush(1.0)
+    assert worker.dropped_events == 1
+
+
+def test_worker_invalid_policy():
+    with pytest.raises(ValueError):
+        BackgroundWorker(overflow_policy="drop_everything")
+
+
+def test_transport_queue_options():
+    client = Client(
+        "http://foobar@localhost/123",
+        transport_queue_size=10,
+        transport_queue_bytes=1000,
+        transport_queue_overflow="drop_oldest",
+    )
+    queue = client.transport._worker._queue
+    assert queue.max_items == 10
+    assert queue.max_bytes == 1000
+    assert queue.policy == "drop_oldest"
+    assert client.transport.dropped_events == 0
+
+
+def test_estimate_event_size_non_string_keys():
+    event = {"extra": {1: "a", (2, 3): "b"}, "contexts": {None: {}}}
+    assert _estimate_event_size(event) > _estimate_event_size({"extra": {}})
+
+
+def test_worker_batches_items():
+    batches = []
+    worker = BackgroundWorker(
+        batch_callback=batches.append, batch_size=3, batch_timeout=0.5
+    )
+    for i in range(5):
+        worker.submit(i)
+    worker.flush(2.0)
+
+    assert [i for batch in batches for i in batch] == [0, 1, 2, 3, 4]
+    assert all(len(batch) <= 3 for batch in batches)
+
+
+def test_transport_sends_envelope(httpserver, request):
+    httpserver.serve_content("ok", 200)
+
+    client = Client(
+        "http://foobar@{}/123".format(httpserver.url[len("http://") :]),
+        transport_batch_size=10,
+        transport_batch_timeout=0.5,
+    )
+    Hub.current.bind_client(client)
+    request.addfinalizer(lambda: Hub.current.bind_client(None))
+
+    for i in range(3):
+        capture_message("message %s" % i)
+    client.close()
+
+    req, = httpserver.requests
+    assert req.path == "/api/123/envelope/"
+    assert req.headers["Content-Type"] == "application/x-sentry-envelope"
+
+    lines = gzip.GzipFile(fileobj=io.BytesIO(req.data)).read().splitlines()
+    assert json.loads(lines[0].decode("utf-8")) == {}
+    items = lines[1:]
+    assert len(items) == 6
+    for header, payload in zip(items[::2], items[1::2]):
+        header = json.loads(header.decode("utf-8"))
+        assert header["type"] == "event"
+        assert header["length"] == len(payload)
+    assert [json.loads(p.decode("utf-8"))["message"] for p in items[1::2]] == [
+        "message 0",
+        "message 1",
+        "message 2",
+    ]
+
+
+def test_transport_prepares_deferred_events_on_worker(httpserver, request):
+    httpserver.serve_content("ok", 200)
+    threads = []
+
+    def before_send(event, hint):
+        threads.append(threading.current_thread())
+        if event["message"] == "drop me":
+            return None
+        return event
+
+    client = Client(
+        "http://foobar@{}/123".format(httpserver.url[len("http://") :]),
+        defer_serialization=True,
+        before_send=before_send,
+    )
+    Hub.current.bind_client(client)
+    request.addfinalizer(lambda: Hub.current.bind_client(None))
+
+    capture_message("drop me")
+    capture_message("keep me")
+    client.close()
+
+    assert len(threads) == 2
+    assert threading.current_thread() not in threads
+
+    req, = httpserver.requests
+    event = json.loads(gzip.GzipFile(fileobj=io.BytesIO(req.data)).read())
+    assert event["message"] == "keep me"
+
+
+def test_worker_sends_concurrently():
+    worker = BackgroundWorker(num_threads=4)
+    release = threading.Event()
+    started = []
+
+    def job():
+        started.append(1)
+        release.wait()
+
+    for _ in range(4):
+        worker.submit(job)
+
+    deadline = time.time() + 2.0
+    while len(started) < 4 and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert len(started) == 4
+    assert worker.in_flight_events == 4
+    assert worker.queued_events == 0
+
+    release.set()
+    worker.flush(1.0)
+    assert worker.in_flight_events == 0
+
+
+def test_worker_restarts_dead_threads_only():
+    worker = BackgroundWorker(num_threads=2)
+    worker.start()
+    first, second = worker._threads
+
+    worker._queue.put(_Job(_TERMINATOR, droppable=False), shard=0)
+    first.join(1.0)
+    assert not worker.is_alive
+
+    sent = []
+    worker.submit(lambda: sent.append(1))
+    worker.flush(1.0)
+
+    assert sent == [1]
+    assert len(worker._threads) == 2
+    assert worker._threads[0] is not first
+    assert worker._threads[1] is second
+    worker.kill()
+
+
+def test_issue_key_logging_event():
+    def logging_event(logger, params):
+        return {
+            "level": "error",
+            "logger": logger,
+            "logentry": {"message": "failed %s", "params": params},
+        }
+
+    key = _issue_key(logging_event("app", ["a"]))
+    assert key is not None
+    assert key == _issue_key(logging_event("app", ["b"]))
+    assert key != _issue_key(logging_event("other", ["a"]))
+    assert _issue_key({"level": "error"}) is None
+
+
+def test_worker_keeps_order_per_key():
+    worker = BackgroundWorker(num_threads=4)
+    sent = []
+
+    for i in range(50):
+        key = "a" if i % 2 else "b"
+        worker.submit(lambda i=i, key=key: sent.append((key, i)), key=key)
+    worker.flush(2.0)
+
+    assert len(sent) == 50
+    for key in "a", "b":
+        numbers = [i for k, i in sent if k == key]
+        assert numbers == sorted(numbers)
+
+
+def test_transport_num_threads():
+    client = Client("http://foobar@localhost/123", transport_num_threads=4)
+    assert client.transport._worker._num_threads == 4
+    assert client.transport._pool.connection_pool_kw["maxsize"] == 4
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_spool_replay(tmpdir, use_mmap):
+    spool = Spool(str(tmpdir), segment_bytes=20, use_mmap=use_mmap)
+    for i in range(5):
+        spool.append(b"s", ("payload %d" % i).encode())
+    assert len(tmpdir.listdir()) > 1
+
+    sent = []
+
+    def send_three(kind, payload):
+        if len(sent) == 3:
+            return False
+        sent.append((kind, payload))
+        return True
+
+    assert not spool.replay(send_three)
+    assert spool.has_data()
+
+    def send(kind, payload):
+        sent.append((kind, payload))
+        return True
+
+    assert spool.replay(send)
+    assert sent == [(b"s", ("payload %d" % i).encode()) for i in range(5)]
+    assert not spool.has_data()
+    assert not tmpdir.listdir()
+
+
+def test_spool_evicts_oldest(tmpdir):
+    spool = Spool(str(tmpdir), max_bytes=100, segment_bytes=30)
+    for i in range(10):
+        spool.append(b"s", ("x" * 20 + "%d" % i).encode())
+
+    sent = []
+    spool.replay(lambda kind, payload: sent.append(payload) or True)
+    assert sent
+    assert len(sent) < 10
+    assert sent[-1].endswith(b"9")
+
+
+def test_transport_starts_replay_lazily(tmpdir):
+    client = Client("http://foobar@localhost/123", spool_dir=str(tmpdir))
+    assert not client.transport._replay_worker.is_alive
+    client.close()
+
+    Spool(str(tmpdir)).append(b"s", b"payload")
+    client = Client("http://foobar@localhost/123", spool_dir=str(tmpdir))
+    assert client.transport._replay_worker.is_alive
+    client.close()
+
+
+def test_transport_spools_and_replays(tmpdir, httpserver):
+    httpserver.serve_content("oops", 503)
+    client = Client(
+        "http://foobar@{}/123".format(httpserver.url[len("http://") :]),
+        spool_dir=str(tmpdir),
+    )
+    transport = client.transport
+
+    with Hub(client):
+        capture_message("first")
+    client.flush(2.0)
+    assert transport._spool.has_data()
+
+    httpserver.serve_content("ok", 200)
+    with Hub(client):
+        capture_message("second")
+    client.flush(2.0)
+
+    deadline = time.time() + 5.0
+    while transport._spool.has_data() and time.time() < deadline:
+        time.sleep(0.05)
+
+    assert not transport._spool.has_data()
+    messages = [
+        json.loads(gzip.GzipFile(fileobj=io.BytesIO(r.data)).read().decode("utf-8"))[
+            "message"
+        ]
+        for r in httpserver.requests
+    ]
+    # The replay thread may have retried while the server was still failing
+    assert messages[0] == "first"
+    assert messages.count("first") >= 2
+    assert "second" in messages
+    client.close()
+
+
+def test_transport_replay_survives_errors(tmpdir, monkeypatch):
+    Spool(str(tmpdir)).append(b"s", b"payload")
+
+    sent = []
+    monkeypatch.setattr(
+        HttpTransport,
+        "_send_spoolable",
+        lambda self, kind, body: sent.append(body) or True,
+    )
+
+    calls = []
+    replay = Spool.replay
+
+    def flaky_replay(self, send):
+        calls.append(send)
+        if len(calls) == 1:
+            raise IOError("disk hiccup")
+        return replay(self, send)
+
+    monkeypatch.setattr(Spool, "replay", flaky_replay)
+
+    client = Client("http://foobar@localhost/123", spool_dir=str(tmpdir))
+    transport = client.transport
+
+    deadline = time.time() + 5.0
+    while not (sent and transport._replay_idle) and time.time() < deadline:
+        time.sleep(0.05)
+
+    assert sent == [b"payload"]
+    # Nothing is polled while the spool is empty
+    assert transport._replay_idle
+    assert len(calls) == 2
+    client.close()
+
+
+def test_transport_spools_queue_on_kill(tmpdir):
+    client = Client("http://foobar@localhost/123", spool_dir=str(tmpdir))
+    transport = client.transport
+    event = {"event_id": "a" * 32, "message": "hi"}
+    # Queue without starting the sender thread
+    transport._worker._queue.put(_Job((Hub.current, event)))
+    transport.kill()
+
+    payloads = []
+    Spool(str(tmpdir)).replay(lambda kind, payload: payloads.append(payload) or True)
+    payload, = payloads
+    assert (
+        json.loads(gzip.GzipFile(fileobj=io.BytesIO(payload)).read().decode("utf-8"))
+        == event
+    )
+
+
+def test_rate_limited_skips_event_construction(monkeypatch, tmpdir):
+    client = Client("http://foobar@localhost/123")
+    transport = client.transport
+    hub = Hub(client)
+
+    def event_from_exception(*args, **kwargs):
+        raise AssertionError("event should not have been built")
+
+    monkeypatch.setattr("sentry_sdk.client.event_from_exception", event_from_exception)
+
+    transport._disabled_until = datetime.utcnow() + timedelta(seconds=60)
+    assert transport.is_rate_limited()
+
+    try:
+        1 / 0
+    except Exception:
+        assert hub.capture_exception() is None
+    assert hub.capture_message("hi") is None
+    assert not transport.queued_events
+    client.close()
+
+    # With a spool nothing is dropped while rate limited
+    client = Client("http://foobar@localhost/123", spool_dir=str(tmpdir))
+    client.transport._disabled_until = datetime.utcnow() + timedelta(seconds=60)
+    assert not client.transport.is_rate_limited()
+    client.close()
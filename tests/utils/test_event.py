@@ -1,11 +1,22 @@
+import copy
 import sys
 import json
+from datetime import datetime
+
+import pytest
+
+from hypothesis import given, settings
+import hypothesis.strategies as st
+
+import sentry_sdk.utils
 
 from sentry_sdk.utils import (
+    HAS_CHAINED_EXCEPTIONS,
     AnnotatedValue,
     convert_types,
     event_from_exception,
     flatten_metadata,
+    normalize_event,
     strip_databag,
     strip_event_mut,
 )
@@ -25,6 +36,33 @@ def test_strip_databag():
     assert len(d["foo"].value) == 512
 
 
+@pytest.mark.skipif(not HAS_CHAINED_EXCEPTIONS, reason="Only works on 3.3+")
+def test_chained_exceptions_share_frames(monkeypatch):
+    calls = []
+    extract_locals = sentry_sdk.utils.extract_locals
+
+    def counting_extract_locals(frame, budget=None):
+        calls.append(frame)
+        return extract_locals(frame, budget)
+
+    monkeypatch.setattr("sentry_sdk.utils.extract_locals", counting_extract_locals)
+
+    try:
+        try:
+            1 / 0
+        except Exception:
+            raise ValueError()
+    except Exception:
+        event, _ = event_from_exception(sys.exc_info())
+
+    first, second = event["exception"]["values"]
+    frame1, = first["stacktrace"]["frames"]
+    frame2, = second["stacktrace"]["frames"]
+    assert frame1["lineno"] != frame2["lineno"]
+    assert frame1["vars"] is frame2["vars"]
+    assert len(calls) == 1
+
+
 def test_strip_exception_vars():
     try:
         a = "A" * 16000  # noqa
@@ -32,8 +70,77 @@ def test_strip_exception_vars():
     except Exception:
         event, _ = event_from_exception(sys.exc_info())
 
-    assert len(json.dumps(event)) > 10000
+    # The repr of `a` is bounded, but still longer than what is kept
+    frame, = event["exception"]["values"][0]["stacktrace"]["frames"]
+    assert len(frame["vars"]["a"]) > 512
     strip_event_mut(event)
     event = flatten_metadata(event)
     event = convert_types(event)
     assert len(json.dumps(event)) < 10000
+
+
+class _Thing(object):
+    def __repr__(self):
+        return "<thing>"
+
+
+def _annotated(children):
+    return st.builds(
+        AnnotatedValue,
+        children,
+        st.fixed_dictionaries({"rem": st.just([["!test", "x"]])}),
+    )
+
+
+_values = st.recursive(
+    st.one_of(
+        st.none(),
+        st.integers(),
+        st.floats(allow_nan=False),
+        st.text(max_size=5),
+        st.just(u"x" * 600),
+        st.binary(max_size=10),
+        st.datetimes(min_value=datetime(2000, 1, 1)),
+        st.builds(_Thing),
+    ),
+    lambda children: st.one_of(
+        st.lists(children, max_size=22),
+        st.dictionaries(st.text(max_size=2), children, max_size=22),
+        _annotated(children),
+    ),
+    max_leaves=30,
+)
+
+_frames = st.lists(
+    st.fixed_dictionaries({"function": st.text(max_size=5), "vars": _values}),
+    max_size=2,
+)
+
+_events = st.fixed_dictionaries(
+    {
+        "exception": st.fixed_dictionaries(
+            {
+                "values": st.lists(
+                    st.fixed_dictionaries(
+                        {"stacktrace": st.fixed_dictionaries({"frames": _frames})}
+                    ),
+                    max_size=2,
+                )
+            }
+        ),
+        "stacktrace": st.fixed_dictionaries({"frames": _frames}),
+        "request": st.fixed_dictionaries({"data": _values}),
+        "breadcrumbs": st.lists(_values, max_size=3),
+        "extra": _values,
+    }
+)
+
+
+@settings(max_examples=50)
+@given(_events)
+def test_normalize_event_matches_chain(event):
+    expected = convert_types(copy.deepcopy(event))
+    strip_event_mut(expected)
+    expected = flatten_metadata(expected)
+
+    assert normalize_event(event) == expected
@@ -11,13 +11,23 @@ from sentry_sdk.utils import (
     BadDsn,
     Dsn,
     safe_repr,
+    object_to_json,
+    add_global_repr_processor,
+    remove_global_repr_processor,
+    bounded_repr,
     exceptions_from_error_tuple,
     format_and_strip,
     strip_string,
     filename_for_module,
     handle_in_app_impl,
     iter_event_stacktraces,
+    get_lines_from_file,
+    SourceCache,
+    get_code_info,
+    should_hide_frame,
 )
+import sentry_sdk.utils
+
 from sentry_sdk._compat import text_type
 
 any_string = st.one_of(st.binary(), st.text())
@@ -30,6 +40,29 @@ def test_safe_repr_never_broken_for_strings(x):
     assert u"broken repr" not in r
 
 
+@given(
+    x=st.recursive(
+        st.one_of(st.none(), st.integers(), st.text(), st.binary()),
+        lambda children: st.one_of(
+            st.lists(children),
+            st.lists(children).map(tuple),
+            st.dictionaries(st.text(), children),
+        ),
+        max_leaves=20,
+    )
+)
+def test_bounded_repr_matches_repr(x):
+    rv = repr(x)
+    if len(rv) < 100:
+        assert bounded_repr(x, limit=100) == rv
+
+
+def test_bounded_repr_limit():
+    assert len(bounded_repr(b"x" * 10 ** 7, limit=100)) < 110
+    assert len(bounded_repr(list(range(10 ** 6)), limit=100)) < 110
+    assert bounded_repr({"a": [u"b" * 1000]}, limit=10) == "{'a': ['bbbbbbb'...]}"
+
+
 def test_safe_repr_regressions():
     assert u"лошадь" in safe_repr(u"лошадь")
 
@@ -180,3 +213,121 @@ def test_iter_stacktraces():
             }
         )
     ) == {1, 2, 3}
+
+
+def test_source_cache(tmpdir, monkeypatch):
+    f = tmpdir.join("foo.py")
+    f.write("a = 1\nb = 2\nc = 3\n")
+    cache = SourceCache(maxsize=1)
+    monkeypatch.setattr("sentry_sdk.utils.source_cache", cache)
+
+    assert get_lines_from_file(str(f), 1) == (["a = 1"], "b = 2", ["c = 3"])
+    assert get_lines_from_file(str(f), 2) == (["a = 1", "b = 2"], "c = 3", [])
+    assert cache.stats == {"hits": 1, "misses": 1, "size": 1}
+
+    # A changed file is loaded again
+    f.write("a = 1\nb = 42\n")
+    os.utime(str(f), (0, 0))
+    assert get_lines_from_file(str(f), 1) == (["a = 1"], "b = 42", [])
+    assert cache.misses == 2
+
+    cache.invalidate(str(f))
+    assert not len(cache)
+
+    # Least recently used files are evicted
+    g = tmpdir.join("bar.py")
+    g.write("x = 1\n")
+    get_lines_from_file(str(f), 0)
+    get_lines_from_file(str(g), 0)
+    assert [key[0] for key in cache._entries] == [str(g)]
+
+
+def test_code_info_cached():
+    def hidden():
+        __traceback_hide__ = True  # noqa
+        return sys._getframe()
+
+    def visible():
+        return sys._getframe()
+
+    frame = visible()
+    info = get_code_info(frame)
+    assert get_code_info(visible()) is info
+    assert info.function == "visible"
+    assert info.module == __name__
+    assert info.abs_path == os.path.abspath(__file__)
+    assert not info.flag_names
+
+    frame = hidden()
+    assert get_code_info(frame).flag_names == ("__traceback_hide__",)
+    # Only frames without a module name are hidden by their locals
+    assert not should_hide_frame(frame)
+
+
+def test_repr_processor_types(monkeypatch):
+    monkeypatch.setattr(
+        "sentry_sdk.utils.global_repr_processors",
+        list(sentry_sdk.utils.global_repr_processors),
+    )
+    calls = []
+
+    class Base(object):
+        pass
+
+    class Child(Base):
+        pass
+
+    def processor(value, hint):
+        calls.append(value)
+        return u"<processed>"
+
+    add_global_repr_processor(processor, types=(Base,))
+
+    assert object_to_json([1, u"a", Child()]) == [u"1", u"'a'", u"<processed>"]
+    assert len(calls) == 1
+
+
+def test_repr_processor_removed(monkeypatch):
+    monkeypatch.setattr(
+        "sentry_sdk.utils.global_repr_processors",
+        list(sentry_sdk.utils.global_repr_processors),
+    )
+
+    def first(value, hint):
+        return u"<first>"
+
+    def second(value, hint):
+        return u"<second>"
+
+    add_global_repr_processor(first, types=(int,))
+    assert object_to_json(1) == u"<first>"
+
+    # Leaves the number of processors unchanged
+    remove_global_repr_processor(first)
+    add_global_repr_processor(second, types=(int,))
+    assert object_to_json(1) == u"<second>"
+
+
+def test_repr_processor_list_changed(monkeypatch):
+    processors = sentry_sdk.utils.global_repr_processors
+    monkeypatch.setattr(
+        "sentry_sdk.utils.global_repr_processors", type(processors)(processors)
+    )
+    processors = sentry_sdk.utils.global_repr_processors
+
+    def first(value, hint):
+        return u"<first>"
+
+    def second(value, hint):
+        return u"<second>"
+
+    assert object_to_json(1) == u"1"
+
+    processors.append(first)
+    assert object_to_json(1) == u"<first>"
+
+    processors[-1] = second
+    assert object_to_json(1) == u"<second>"
+
+    del processors[-1]
+    assert object_to_json(1) == u"1"